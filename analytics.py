@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+
+# Column -> value used when a comment record lacks it
+COMMENT_DEFAULTS = {
+    "user_name": "Unknown",
+    "user_url": "",
+    "date_created": None,
+    "comment_text": "",
+    "likes_count": 0,
+    "replies_count": 0,
+    "sentiment": None,
+    "emotion": None,
+    "confidence": 0.0,
+}
+
+
+def typed_comments(frame):
+    """
+    Normalize a comments DataFrame from any output format to one schema
+
+    Dates become UTC timestamps (NaT when missing), sentiment and emotion
+    categoricals (NaN when empty), counts int32 and confidence float32.
+    Adds the derived length and hour columns used by the charts.
+    """
+    frame = frame.reindex(columns=list(COMMENT_DEFAULTS))
+    for column, default in COMMENT_DEFAULTS.items():
+        if default is not None:
+            frame[column] = frame[column].fillna(default)
+
+    frame["user_name"] = frame["user_name"].astype(str)
+    frame["comment_text"] = frame["comment_text"].astype(str)
+    frame["date_created"] = pd.to_datetime(
+        frame["date_created"].replace("", None), errors="coerce", utc=True
+    )
+    for column in ("likes_count", "replies_count"):
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").fillna(0)
+        frame[column] = frame[column].astype("int32")
+    frame["confidence"] = (
+        pd.to_numeric(frame["confidence"], errors="coerce").fillna(0).astype("float32")
+    )
+    for column in ("sentiment", "emotion"):
+        values = frame[column].astype("object")
+        frame[column] = values.where(values.notna() & (values != ""), None).astype(
+            "category"
+        )
+
+    frame["length"] = frame["comment_text"].str.len().astype("int32")
+    frame["hour"] = frame["date_created"].dt.hour
+    return frame
+
+
+def comments_frame(comments):
+    """Typed DataFrame of a list of comment_data dicts"""
+    return typed_comments(pd.DataFrame.from_records(comments))
+
+
+def histogram(values, bins=20):
+    """
+    Returns:
+        DataFrame: bin start, bin end and count per bin, empty for no values
+    """
+    values = np.asarray(values, dtype="float64")
+    if not len(values):
+        return pd.DataFrame(columns=["start", "end", "count"])
+    counts, edges = np.histogram(values, bins=bins)
+    return pd.DataFrame({"start": edges[:-1], "end": edges[1:], "count": counts})
+
+
+def build_analytics(frame):
+    """
+    Every aggregate the dashboard draws, computed once per dataset
+
+    Args:
+        frame: Output of typed_comments()
+
+    Returns:
+        dict: frame plus sentiment/emotion counts, hourly series, sentiment x
+        emotion crosstab, length and confidence histograms and engagement
+        figures
+    """
+    confidence = frame["confidence"][frame["confidence"] > 0]
+    labelled = frame.dropna(subset=["sentiment", "emotion"])
+
+    return {
+        "frame": frame,
+        "sentiment_counts": frame["sentiment"]
+        .value_counts()
+        .loc[lambda counts: counts > 0],
+        "emotion_counts": frame["emotion"]
+        .value_counts()
+        .loc[lambda counts: counts > 0],
+        "hourly_counts": frame["hour"].value_counts().sort_index(),
+        "crosstab": pd.crosstab(
+            labelled["sentiment"].astype(str), labelled["emotion"].astype(str)
+        ),
+        "length_histogram": histogram(frame["length"]),
+        "confidence_histogram": histogram(confidence),
+        "average_confidence": float(confidence.mean()) if len(confidence) else None,
+        "with_likes": int((frame["likes_count"] > 0).sum()),
+        "with_replies": int((frame["replies_count"] > 0).sum()),
+        "average_length": float(frame["length"].mean()) if len(frame) else 0.0,
+    }
+
+
+def filter_comments(
+    frame,
+    sentiments=None,
+    emotions=None,
+    min_confidence=0.0,
+    min_likes=0,
+    start=None,
+    end=None,
+):
+    """
+    Comments matching every given filter, as one vectorized boolean mask
+
+    Args:
+        frame: Output of typed_comments()
+        sentiments: Sentiment labels to keep, or None/empty for all
+        emotions: Emotion labels to keep, or None/empty for all
+        min_confidence: Lowest confidence kept
+        min_likes: Lowest likes_count kept
+        start: First date kept (datetime.date, UTC), or None
+        end: Last date kept (datetime.date, UTC, inclusive), or None
+
+    Returns:
+        DataFrame: View of the matching rows
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    if sentiments:
+        mask &= frame["sentiment"].isin(sentiments).to_numpy()
+    if emotions:
+        mask &= frame["emotion"].isin(emotions).to_numpy()
+    if min_confidence:
+        mask &= (frame["confidence"] >= min_confidence).to_numpy()
+    if min_likes:
+        mask &= (frame["likes_count"] >= min_likes).to_numpy()
+    if start is not None:
+        mask &= (frame["date_created"] >= pd.Timestamp(start, tz="UTC")).to_numpy()
+    if end is not None:
+        mask &= (
+            frame["date_created"] < pd.Timestamp(end, tz="UTC") + pd.Timedelta(days=1)
+        ).to_numpy()
+    return frame[mask]
+
+
+def page_of(frame, sort_by=None, ascending=True, page=1, page_size=50):
+    """
+    One page of frame, sorted on sort_by
+
+    Only the rows of the page are copied out, so the caller can hand it to
+    the frontend without serializing the whole table.
+
+    Returns:
+        tuple: (page rows, number of pages)
+    """
+    pages = max(1, -(-len(frame) // page_size))
+    page = min(max(1, page), pages)
+    start = (page - 1) * page_size
+    if sort_by:
+        # Stable, so ties keep their original order; missing values last
+        frame = frame.sort_values(
+            sort_by, ascending=ascending, kind="stable", na_position="last"
+        )
+    return frame.iloc[start : start + page_size], pages
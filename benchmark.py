@@ -0,0 +1,570 @@
+"""
+Offline throughput benchmark for facebook_cli.py
+
+Starts local HTTP stand-ins for the BrightData Datasets API and the
+OpenAI-compatible chat completions endpoint, points facebook_cli.py at them
+through BRIGHTDATA_BASE_URL / OPENROUTER_BASE_URL and runs it end to end at
+several comment counts. Fixtures are synthetic posts and comments scaled up
+from the shapes in data/*.json, so no money is spent and no real scrape is
+waited on.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --sizes 100 1000 --llm-latency 0.2 --llm-429-rate 0.05
+    python benchmark.py --cli-args "-b 20 -c 16" --json bench.json
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import zlib
+import random
+import shlex
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from data_store import index_file
+
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+POST_DATASET_ID = "bench_post"
+COMMENTS_DATASET_ID = "bench_comments"
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "facebook_cli.py")
+
+LABELS = [
+    ("Positive", "Joy"),
+    ("Positive", "Surprise"),
+    ("Neutral", "Neutral"),
+    ("Negative", "Anger"),
+    ("Negative", "Sadness"),
+    ("Negative", "Fear"),
+]
+
+
+class Fixtures:
+    """
+    Synthetic BrightData records shaped like the outputs in data/*.json
+
+    Comments are built from the words of the real fixture comments, with a
+    share of them copied verbatim so deduplication has realistic work to do.
+    Everything is seeded, so a size always yields the same records.
+
+    Args:
+        pattern: Glob of scraper outputs to take shapes from
+        duplicate_rate: Share of comments that repeat a fixture comment
+    """
+
+    def __init__(self, pattern="data/*.json", duplicate_rate=0.2):
+        self.duplicate_rate = duplicate_rate
+        self.posts = []
+        self.comments = []
+
+        for path in sorted(glob.glob(pattern)):
+            if path.endswith(".post.json"):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("post") and data["post"].get("raw_data"):
+                self.posts.append(data["post"]["raw_data"])
+            self.comments.extend(
+                comment
+                for comment in data.get("comments", [])
+                if comment.get("comment_text")
+            )
+
+        if not self.posts or not self.comments:
+            raise ValueError(f"No post and comment fixtures found in {pattern}")
+
+        self.words = [
+            word
+            for comment in self.comments
+            for word in comment["comment_text"].split()
+        ]
+
+    def post_record(self, url):
+        record = dict(self.posts[zlib.crc32(url.encode("utf-8")) % len(self.posts)])
+        record["url"] = url
+        record["input"] = {"url": url}
+        return record
+
+    def comment_records(self, url, count):
+        rng = random.Random(f"{url}:{count}")
+        for number in range(count):
+            template = rng.choice(self.comments)
+            if rng.random() < self.duplicate_rate:
+                text = template["comment_text"]
+            else:
+                text = " ".join(rng.choices(self.words, k=rng.randint(3, 25)))
+            yield {
+                "url": url,
+                "input": {"url": url},
+                "user_name": template.get("user_name", "Unknown"),
+                "user_url": f"https://www.facebook.com/bench.user.{number}",
+                "date_created": time.strftime(
+                    "%Y-%m-%dT%H:%M:%S.000Z",
+                    time.gmtime(1764000000 + number * 7),
+                ),
+                "comment_text": text,
+                "likes_count": rng.choice([0, 0, 0, 1, 2, 5, 40]),
+                "replies_count": rng.choice([0, 0, 0, 1, 3]),
+            }
+
+
+class StandIn:
+    """
+    Local BrightData and OpenAI-compatible API on one threaded HTTP server
+
+    Routes:
+        POST /datasets/v3/trigger
+        GET  /datasets/v3/progress/<snapshot_id>
+        GET  /datasets/v3/snapshot/<snapshot_id>?format=json|ndjson
+        POST /v1/chat/completions
+
+    Args:
+        fixtures: Fixtures the snapshots are generated from
+        scrape_delay: Seconds a snapshot stays "running" after its trigger
+        llm_latency: Mean seconds per chat completion
+        llm_jitter: Fraction of llm_latency randomly added or removed
+        llm_error_rate: Share of completions answered with a 500
+        llm_429_rate: Share of completions answered with a 429
+        retry_after: Retry-After seconds sent with every 429
+        brightdata_error_rate: Share of progress polls answered with a 503
+    """
+
+    def __init__(
+        self,
+        fixtures,
+        scrape_delay=2.0,
+        llm_latency=0.05,
+        llm_jitter=0.5,
+        llm_error_rate=0.0,
+        llm_429_rate=0.0,
+        retry_after=1.0,
+        brightdata_error_rate=0.0,
+    ):
+        self.fixtures = fixtures
+        self.scrape_delay = scrape_delay
+        self.llm_latency = llm_latency
+        self.llm_jitter = llm_jitter
+        self.llm_error_rate = llm_error_rate
+        self.llm_429_rate = llm_429_rate
+        self.retry_after = retry_after
+        self.brightdata_error_rate = brightdata_error_rate
+        self.snapshots = {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.random = random.Random(0)
+        self.server = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self.lock:
+            self.calls[name] += 1
+
+    def roll(self, rate):
+        with self.lock:
+            return rate and self.random.random() < rate
+
+    def start(self, host="127.0.0.1", port=0):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                stand_in.handle(self, "POST")
+
+            def do_GET(self):
+                stand_in.handle(self, "GET")
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+            self.snapshots.clear()
+
+    def handle(self, request, method):
+        parsed = urlparse(request.path)
+        parts = parsed.path.strip("/").split("/")
+        body = None
+        if method == "POST":
+            length = int(request.headers.get("Content-Length") or 0)
+            body = json.loads(request.rfile.read(length) or b"null")
+
+        if parts[:2] == ["datasets", "v3"] and len(parts) >= 3:
+            query = parse_qs(parsed.query)
+            if method == "POST" and parts[2] == "trigger":
+                return self.trigger(request, query, body)
+            if method == "GET" and parts[2] == "progress" and len(parts) == 4:
+                return self.progress(request, parts[3])
+            if method == "GET" and parts[2] == "snapshot" and len(parts) == 4:
+                return self.snapshot(request, parts[3], query)
+        if method == "POST" and parsed.path.endswith("/chat/completions"):
+            return self.chat_completion(request, body)
+
+        self.count("not_found")
+        self.send_json(request, 404, {"error": f"no route for {method} {parsed.path}"})
+
+    @staticmethod
+    def send_json(request, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def trigger(self, request, query, inputs):
+        self.count("brightdata_trigger")
+        dataset_id = query.get("dataset_id", [""])[0]
+        with self.lock:
+            snapshot_id = f"s_bench_{len(self.snapshots) + 1:06d}"
+            self.snapshots[snapshot_id] = {
+                "dataset_id": dataset_id,
+                "inputs": inputs or [],
+                "ready_at": time.monotonic() + self.scrape_delay,
+            }
+        self.send_json(request, 200, {"snapshot_id": snapshot_id})
+
+    def progress(self, request, snapshot_id):
+        self.count("brightdata_progress")
+        snapshot = self.snapshots.get(snapshot_id)
+        if snapshot is None:
+            return self.send_json(request, 404, {"error": "unknown snapshot"})
+        if self.roll(self.brightdata_error_rate):
+            self.count("brightdata_errors_served")
+            return self.send_json(request, 503, {"error": "unavailable"})
+        status = "ready" if time.monotonic() >= snapshot["ready_at"] else "running"
+        self.send_json(request, 200, {"snapshot_id": snapshot_id, "status": status})
+
+    def records(self, snapshot):
+        for item in snapshot["inputs"]:
+            url = item.get("url", "")
+            if snapshot["dataset_id"] == COMMENTS_DATASET_ID:
+                yield from self.fixtures.comment_records(
+                    url, int(item.get("limit_records") or 100)
+                )
+            else:
+                yield self.fixtures.post_record(url)
+
+    def snapshot(self, request, snapshot_id, query):
+        self.count("brightdata_snapshot")
+        snapshot = self.snapshots.get(snapshot_id)
+        if snapshot is None:
+            return self.send_json(request, 404, {"error": "unknown snapshot"})
+
+        if query.get("format", ["json"])[0] != "ndjson":
+            return self.send_json(request, 200, list(self.records(snapshot)))
+
+        # No Content-Length: the body ends when the connection closes, which
+        # lets 100k records stream out without being built in memory first
+        request.close_connection = True
+        request.send_response(200)
+        request.send_header("Content-Type", "application/x-ndjson")
+        request.send_header("Connection", "close")
+        request.end_headers()
+        for record in self.records(snapshot):
+            request.wfile.write(
+                (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+            )
+
+    def label(self, text):
+        sentiment, emotion = LABELS[zlib.crc32(text.encode("utf-8")) % len(LABELS)]
+        return {"sentiment": sentiment, "emotion": emotion, "confidence": 0.85}
+
+    def chat_completion(self, request, body):
+        self.count("llm_calls")
+        if self.llm_latency:
+            with self.lock:
+                delay = self.random.uniform(
+                    self.llm_latency * (1 - self.llm_jitter),
+                    self.llm_latency * (1 + self.llm_jitter),
+                )
+            time.sleep(delay)
+
+        if self.roll(self.llm_429_rate):
+            self.count("llm_429_served")
+            return self.send_json(
+                request,
+                429,
+                {"error": {"message": "rate limited", "code": 429}},
+                {"Retry-After": str(self.retry_after)},
+            )
+        if self.roll(self.llm_error_rate):
+            self.count("llm_errors_served")
+            return self.send_json(
+                request, 500, {"error": {"message": "internal error", "code": 500}}
+            )
+
+        messages = body.get("messages", [])
+        suffix = messages[-1]["content"] if messages else ""
+        if suffix.startswith("USER COMMENTS ("):
+            lines = [line for line in suffix.splitlines()[1:] if line.startswith("[")]
+            reply = {
+                "results": [
+                    {"id": number, **self.label(line)}
+                    for number, line in enumerate(lines, 1)
+                ]
+            }
+            with self.lock:
+                self.calls["llm_comments"] += len(lines)
+        else:
+            reply = self.label(suffix)
+            self.count("llm_comments")
+
+        content = json.dumps(reply)
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 2 + 1
+        completion_tokens = len(content) // 4 + 1
+        self.send_json(
+            request,
+            200,
+            {
+                "id": f"bench-{self.calls['llm_calls']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "bench"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
+
+
+def run_cli(stand_in, size, cli_args, workdir):
+    """
+    Run facebook_cli.py once against the stand-ins
+
+    Returns:
+        dict: size, wall time, comments/sec, peak RSS (None where os.wait4
+        is missing, i.e. on Windows), saved comment count and the calls the
+        stand-ins served
+    """
+    output = os.path.join(workdir, f"bench_{size}.json")
+    log_path = os.path.join(workdir, f"bench_{size}.log")
+    env = {
+        **os.environ,
+        "BRIGHTDATA_API_KEY": "bench",
+        "OPENROUTER_API_KEY": "bench",
+        "POST_DATASET_ID": POST_DATASET_ID,
+        "COMMENTS_DATASET_ID": COMMENTS_DATASET_ID,
+        "BRIGHTDATA_BASE_URL": f"{stand_in.url}/datasets/v3",
+        "OPENROUTER_BASE_URL": f"{stand_in.url}/v1",
+        "PYTHONUNBUFFERED": "1",
+    }
+    command = [
+        sys.executable,
+        CLI_PATH,
+        f"https://m.facebook.com/bench/posts/{size}",
+        "-n",
+        str(size),
+        "-o",
+        output,
+    ] + cli_args
+
+    stand_in.reset()
+    started = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen(
+            command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        peak_rss = None
+        if hasattr(os, "wait4"):
+            # wait4 gives the child's own resource usage, including peak RSS;
+            # ru_maxrss is in KiB on Linux and bytes on macOS
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            peak_rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        else:
+            process.wait()
+    wall = time.perf_counter() - started
+
+    saved = index_file(output)["comments"] if os.path.exists(output) else 0
+
+    return {
+        "size": size,
+        "ok": process.returncode == 0 and saved == size,
+        "wall_seconds": round(wall, 3),
+        "comments_per_second": round(saved / wall, 1) if wall else 0.0,
+        "peak_rss_mb": round(peak_rss / 2**20, 1) if peak_rss is not None else None,
+        "saved_comments": saved,
+        "calls": dict(stand_in.calls),
+        "log": log_path,
+    }
+
+
+def print_report(results):
+    print("\n" + "=" * 96)
+    print(" BENCHMARK")
+    print("=" * 96)
+    print(
+        f"{'comments':>9} {'wall s':>9} {'comments/s':>11} {'peak RSS MB':>12} "
+        f"{'LLM calls':>10} {'429s':>6} {'5xx':>5} {'polls':>6} {'ok':>4}"
+    )
+    for result in results:
+        calls = result["calls"]
+        rss = result["peak_rss_mb"]
+        print(
+            f"{result['size']:>9} {result['wall_seconds']:>9.2f} "
+            f"{result['comments_per_second']:>11.1f} "
+            f"{'n/a' if rss is None else f'{rss:.1f}':>12} "
+            f"{calls.get('llm_calls', 0):>10} {calls.get('llm_429_served', 0):>6} "
+            f"{calls.get('llm_errors_served', 0):>5} "
+            f"{calls.get('brightdata_progress', 0):>6} "
+            f"{'yes' if result['ok'] else 'NO':>4}"
+        )
+    for result in results:
+        if not result["ok"]:
+            print(f"\n Run with {result['size']} comments failed, see {result['log']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline throughput benchmark for facebook_cli.py",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Usage:")[1],
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_SIZES),
+        help="Comment counts to run (default: 100 1000 10000 100000)",
+    )
+    parser.add_argument(
+        "--cli-args",
+        default="",
+        help='Extra facebook_cli.py arguments, e.g. "-b 20 -c 16"',
+    )
+    parser.add_argument(
+        "--fixtures", default="data/*.json", help="Outputs to take record shapes from"
+    )
+    parser.add_argument(
+        "--duplicate-rate",
+        type=float,
+        default=0.2,
+        help="Share of comments repeating a fixture comment (default: 0.2)",
+    )
+    parser.add_argument(
+        "--scrape-delay",
+        type=float,
+        default=2.0,
+        help="Seconds each snapshot stays running (default: 2)",
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.05,
+        help="Mean seconds per chat completion (default: 0.05)",
+    )
+    parser.add_argument(
+        "--llm-jitter",
+        type=float,
+        default=0.5,
+        help="Fraction of the latency randomly added or removed (default: 0.5)",
+    )
+    parser.add_argument(
+        "--llm-error-rate",
+        type=float,
+        default=0.0,
+        help="Share of completions answered with a 500 (default: 0)",
+    )
+    parser.add_argument(
+        "--llm-429-rate",
+        type=float,
+        default=0.0,
+        help="Share of completions answered with a 429 (default: 0)",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=1.0,
+        help="Retry-After seconds sent with 429s (default: 1)",
+    )
+    parser.add_argument(
+        "--brightdata-error-rate",
+        type=float,
+        default=0.0,
+        help="Share of progress polls answered with a 503 (default: 0)",
+    )
+    parser.add_argument(
+        "--workdir",
+        default=None,
+        help="Directory for outputs and logs (default: a temporary directory)",
+    )
+    parser.add_argument(
+        "--json", default=None, help="Also write the results to this JSON file"
+    )
+    args = parser.parse_args()
+
+    stand_in = StandIn(
+        Fixtures(args.fixtures, args.duplicate_rate),
+        scrape_delay=args.scrape_delay,
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        llm_error_rate=args.llm_error_rate,
+        llm_429_rate=args.llm_429_rate,
+        retry_after=args.retry_after,
+        brightdata_error_rate=args.brightdata_error_rate,
+    ).start()
+    print(f"Stand-ins listening on {stand_in.url}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="fb_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    cli_args = shlex.split(args.cli_args)
+
+    results = []
+    try:
+        for size in args.sizes:
+            print(f"Running {size} comments...")
+            # A fresh working directory per run, so the sentiment cache and
+            # checkpoints of earlier runs never speed up this one
+            run_dir = tempfile.mkdtemp(prefix=f"{size}_", dir=workdir)
+            results.append(run_cli(stand_in, size, cli_args, run_dir))
+    except KeyboardInterrupt:
+        print("\nBenchmark interrupted")
+    finally:
+        stand_in.stop()
+
+    print_report(results)
+    print(f"\nOutputs and logs: {workdir}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+BRIGHTDATA_BASE_URL = "https://api.brightdata.com/datasets/v3"
+
+
+class SnapshotError(Exception):
+    """A snapshot's records could not be downloaded in full"""
+
+
+class BrightDataClient:
+    """
+    BrightData Datasets API client on one pooled, retrying requests.Session
+
+    The session keeps connections alive between calls, so the many progress
+    polls of a run reuse one TLS connection instead of handshaking each time.
+    GETs are retried on connection errors, read timeouts, 429s and 5xx
+    responses with exponential backoff, honoring Retry-After. Trigger POSTs
+    are not idempotent, since a read timeout may come after BrightData
+    accepted the job and a retry would start a second billed snapshot. They
+    are only retried when the connection could not be made at all.
+
+    Args:
+        api_key: BrightData API key
+        base_url: Datasets API root, overridable for local stand-ins
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait between bytes of a response
+        retries: Retry attempts for transient failures
+        backoff: Base of the exponential backoff between retries, in seconds
+        pool_size: Connections kept open per host
+    """
+
+    def __init__(
+        self,
+        api_key,
+        base_url=BRIGHTDATA_BASE_URL,
+        connect_timeout=10,
+        read_timeout=60,
+        retries=4,
+        backoff=0.5,
+        pool_size=16,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            # Connect errors are retried for every method; read errors and
+            # retryable statuses only for these
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size
+        )
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {api_key}"})
+
+    def trigger(self, inputs, dataset_id):
+        """
+        Trigger one scraping job covering several inputs
+
+        Args:
+            inputs: List of dicts with "url" and optionally "limit_records"
+            dataset_id: BrightData dataset to scrape with
+
+        Returns:
+            str: Snapshot ID, or None if the trigger failed
+        """
+        params = {
+            "dataset_id": dataset_id,
+            "include_errors": "true",
+        }
+
+        response = self.session.post(
+            f"{self.base_url}/trigger", params=params, json=inputs, timeout=self.timeout
+        )
+
+        if response.status_code == 200:
+            return response.json().get("snapshot_id")
+        else:
+            print(f"Error triggering scrape: {response.text}")
+            return None
+
+    def progress(self, snapshot_id):
+        """
+        Check the progress of a scraping job
+
+        A 4xx reply other than 408/429 (unknown or expired snapshot, bad key)
+        will not change on retry, so it is reported as status "failed".
+
+        Returns:
+            tuple: (status or None, Retry-After seconds or None)
+        """
+        try:
+            response = self.session.get(
+                f"{self.base_url}/progress/{snapshot_id}", timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            # A failed poll is not fatal, the poller simply tries again later
+            print(f"   Progress check error: {e}")
+            return None, None
+
+        retry_after = response.headers.get("Retry-After")
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None
+
+        if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+            print(
+                f"   Progress check error: HTTP {response.status_code} "
+                f"{response.text[:200]!r}"
+            )
+            return "failed", retry_after
+        if response.status_code != 200:
+            return None, retry_after
+        try:
+            return response.json().get("status"), retry_after
+        except ValueError:
+            print(f"   Progress check error: unreadable reply {response.text[:200]!r}")
+            return None, retry_after
+
+    def results(self, snapshot_id):
+        """Get all records of a completed scraping job as one list"""
+        response = self.session.get(
+            f"{self.base_url}/snapshot/{snapshot_id}",
+            params={"format": "json"},
+            timeout=self.timeout,
+        )
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            print(f"Error getting results: {response.text}")
+            return None
+
+    def iter_results(self, snapshot_id):
+        """
+        Stream the records of a completed scraping job
+
+        Downloads the snapshot as NDJSON and yields one record dict at a time,
+        so memory stays flat however large the snapshot is and callers can
+        start on the first record before the download finishes.
+
+        Raises:
+            SnapshotError: on any reply but 200 (including 202, snapshot
+                still building) or a connection lost mid-download, so a
+                failed download is never mistaken for an empty snapshot
+        """
+        try:
+            with self.session.get(
+                f"{self.base_url}/snapshot/{snapshot_id}",
+                params={"format": "ndjson"},
+                stream=True,
+                timeout=self.timeout,
+            ) as response:
+                if response.status_code != 200:
+                    raise SnapshotError(
+                        f"HTTP {response.status_code} for snapshot {snapshot_id}: "
+                        f"{response.text[:200]}"
+                    )
+
+                for line in response.iter_lines(decode_unicode=True):
+                    if line:
+                        yield json.loads(line)
+        except requests.RequestException as e:
+            raise SnapshotError(
+                f"download of snapshot {snapshot_id} failed: {e}"
+            ) from e
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,106 @@
+import os
+import json
+import threading
+
+
+CHECKPOINT_DIR = ".checkpoints"
+RUNS_FILE = os.path.join(CHECKPOINT_DIR, "runs.json")
+
+# Serializes read-modify-write of RUNS_FILE when several posts are scraped
+# from one process (watch mode)
+_runs_lock = threading.Lock()
+
+
+class CheckpointJournal:
+    """
+    Append-only JSONL journal of analyzed comments for one comments snapshot
+
+    Every analyzed comment is written and flushed as soon as it is done, one
+    line per comment keyed by snapshot ID and comment index, so a run that
+    dies part-way keeps everything it already paid the LLM for.
+    """
+
+    def __init__(self, snapshot_id, directory=CHECKPOINT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_id = snapshot_id
+        self.path = os.path.join(directory, f"{snapshot_id}.jsonl")
+        self.lock = threading.Lock()
+        self.file = None
+
+    def load(self):
+        """
+        Returns:
+            dict: comment index -> comment_data for every journaled comment
+        """
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave the last line half written
+                    continue
+                if entry.get("snapshot_id") == self.snapshot_id:
+                    done[entry["index"]] = entry["comment"]
+        return done
+
+    def append(self, index, comment_data):
+        line = json.dumps(
+            {"snapshot_id": self.snapshot_id, "index": index, "comment": comment_data},
+            ensure_ascii=False,
+        )
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def remove(self):
+        """Delete the journal once its run has been saved"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def load_runs():
+    if not os.path.exists(RUNS_FILE):
+        return {}
+    with open(RUNS_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_run(post_url):
+    """Snapshot IDs recorded for an unfinished run on post_url, or None"""
+    return load_runs().get(post_url)
+
+
+def record_run(post_url, snapshots):
+    """Remember the snapshot IDs of a run so --resume can pick them up"""
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    with _runs_lock:
+        runs = load_runs()
+        runs[post_url] = snapshots
+        with open(RUNS_FILE, "w", encoding="utf-8") as f:
+            json.dump(runs, f, indent=2)
+
+
+def finish_run(post_url):
+    """Forget a run after its output has been saved"""
+    with _runs_lock:
+        runs = load_runs()
+        snapshots = runs.pop(post_url, None)
+        if snapshots is None:
+            return
+        with open(RUNS_FILE, "w", encoding="utf-8") as f:
+            json.dump(runs, f, indent=2)
+    if snapshots.get("comments"):
+        CheckpointJournal(snapshots["comments"]).remove()
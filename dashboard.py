@@ -1,16 +1,84 @@
+import os
 import streamlit as st
 import json
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-from collections import Counter
+from analytics import (
+    COMMENT_DEFAULTS,
+    build_analytics,
+    comments_frame,
+    filter_comments,
+    page_of,
+    typed_comments,
+)
+from data_store import DataStore, DEFAULT_DATA_DIR, file_signature
+from output_formats import metadata_path, read_comments_frame
+
+# Folder of facebook_cli.py outputs (.json, or .parquet/.jsonl next to
+# their .post.json metadata file)
+DATA_DIR = os.getenv("DASHBOARD_DATA_DIR", DEFAULT_DATA_DIR)
+
+
+@st.cache_data(ttl=10)
+def list_posts(directory):
+    return DataStore(directory).scan()
+
+
+@st.cache_resource(max_entries=16)
+def load_post(path, signature):
+    """
+    Post metadata and analytics of one output, built once per file version
 
+    signature (mtime, size) is part of the cache key, so a rewritten file is
+    reloaded while unchanged ones come from the cache. cache_resource hands
+    back the same objects on every rerun instead of unpickling copies; the
+    dashboard only reads them.
 
-@st.cache_data
-def load_data():
-    with open("test.json", "r", encoding="utf-8") as file:
-        return json.load(file)
+    Raises:
+        ValueError: for a combined --urls-file output, which holds many posts
+    """
+    if path.endswith(".json"):
+        data = DataStore.load(path)
+        if "comments" not in data:
+            raise ValueError(f"{path} is not a single-post output")
+        frame = comments_frame(data.pop("comments"))
+    else:
+        with open(metadata_path(path), "r", encoding="utf-8") as file:
+            data = json.load(file)
+        frame = typed_comments(read_comments_frame(path, list(COMMENT_DEFAULTS)))
+    return data, build_analytics(frame)
+
+
+# Comment frame column -> All Comments table header
+COMMENT_TABLE_COLUMNS = {
+    "user_name": "User",
+    "comment_text": "Comment",
+    "date_created": "Date",
+    "likes_count": "Likes",
+    "replies_count": "Replies",
+    "sentiment": "Sentiment",
+    "emotion": "Emotion",
+    "confidence": "Confidence",
+}
+
+
+def histogram_chart(bins, title, x_label):
+    """Bar chart of a precomputed analytics histogram"""
+    fig = go.Figure(
+        data=[
+            go.Bar(
+                x=(bins["start"] + bins["end"]) / 2,
+                y=bins["count"],
+                width=bins["end"] - bins["start"],
+            )
+        ]
+    )
+    fig.update_layout(
+        title=title, xaxis_title=x_label, yaxis_title="Number of Comments"
+    )
+    return fig
 
 
 st.set_page_config(page_title="Facebook Post Analytics", layout="wide", page_icon="📊")
@@ -43,13 +111,38 @@ st.markdown(
 )
 
 
-data = load_data()
-
 st.markdown(
     '<div class="main-header">📊 Facebook Post Analytics Dashboard</div>',
     unsafe_allow_html=True,
 )
 
+posts = list_posts(DATA_DIR)
+if not posts:
+    st.warning(f"No scraper outputs found in {DATA_DIR}")
+    st.stop()
+
+
+def post_label(entry):
+    name = os.path.basename(entry["path"])
+    return f"{name} · {entry.get('scraped_at') or 'N/A'} · {entry['comments']} comments"
+
+
+st.sidebar.title("🗂️ Post")
+selected_post = st.sidebar.selectbox(
+    "Select post", posts, format_func=post_label, label_visibility="collapsed"
+)
+
+try:
+    data, analytics = load_post(
+        selected_post["path"], file_signature(selected_post["path"])
+    )
+except FileNotFoundError:
+    list_posts.clear()
+    st.rerun()
+except ValueError as e:
+    st.error(f"Cannot load {selected_post['path']}: {e}")
+    st.stop()
+
 st.sidebar.title("📋 Navigation")
 section = st.sidebar.radio(
     "Go to",
@@ -62,20 +155,24 @@ section = st.sidebar.radio(
     ],
 )
 
-post_content = data["post"]["content"]
-post_url = data["post"]["url"]
-post_date = data["post"]["raw_data"].get("date_posted", "N/A")
-comments = data["comments"]
+# --comments-only outputs and posts whose scrape failed have "post": null;
+# their sections fall back to the comments alone
+post = data.get("post") or {}
+raw_data = post.get("raw_data") or {}
+post_content = post.get("content") or "Post details were not scraped"
+post_url = post.get("url") or data.get("post_url", "")
+post_date = raw_data.get("date_posted", "N/A")
+comments_df = analytics["frame"]
 stats = data["statistics"]
 
 photo_url = None
-if data["post"]["raw_data"].get("attachments"):
-    photo_url = data["post"]["raw_data"]["attachments"][0]["url"]
+if raw_data.get("attachments"):
+    photo_url = raw_data["attachments"][0]["url"]
 
-likes_breakdown = data["post"]["raw_data"].get("num_likes_type", [])
+likes_breakdown = raw_data.get("num_likes_type", [])
 total_likes = sum([item["num"] for item in likes_breakdown])
-num_comments = data["post"]["raw_data"].get("num_comments", 0)
-num_shares = data["post"]["raw_data"].get("num_shares", 0)
+num_comments = raw_data.get("num_comments", len(comments_df))
+num_shares = raw_data.get("num_shares", 0)
 
 # ============ OVERVIEW SECTION ============
 if section == "Overview":
@@ -141,11 +238,12 @@ if section == "Overview":
 
     with col2:
         st.subheader("💭 Comment Sentiments")
-        sentiment_counts = Counter(
-            [c["sentiment"] for c in comments if c.get("sentiment")]
-        )
+        sentiment_counts = analytics["sentiment_counts"]
         sentiment_df = pd.DataFrame(
-            sentiment_counts.items(), columns=["Sentiment", "Count"]
+            {
+                "Sentiment": sentiment_counts.index.astype(str),
+                "Count": sentiment_counts.values,
+            }
         )
         fig = px.bar(
             sentiment_df,
@@ -177,15 +275,11 @@ elif section == "Post Details":
         metadata = {
             "Post URL": post_url,
             "Date Posted": post_date,
-            "Author": data["post"]["raw_data"].get("user_username_raw", "N/A"),
-            "Profile Handle": data["post"]["raw_data"].get("profile_handle", "N/A"),
-            "Post ID": data["post"]["raw_data"].get("post_id", "N/A"),
-            "Verified": (
-                "✅ Yes"
-                if data["post"]["raw_data"].get("page_is_verified")
-                else "❌ No"
-            ),
-            "Followers": data["post"]["raw_data"].get("page_followers", "N/A"),
+            "Author": raw_data.get("user_username_raw", "N/A"),
+            "Profile Handle": raw_data.get("profile_handle", "N/A"),
+            "Post ID": raw_data.get("post_id", "N/A"),
+            "Verified": ("✅ Yes" if raw_data.get("page_is_verified") else "❌ No"),
+            "Followers": raw_data.get("page_followers", "N/A"),
         }
         for key, value in metadata.items():
             st.text(f"{key}: {value}")
@@ -253,47 +347,95 @@ elif section == "Post Details":
 elif section == "Comments Analysis":
     st.header("💬 Comments Analysis")
 
-    st.metric("Total Comments Analyzed", len(comments))
+    st.metric("Total Comments Analyzed", len(comments_df))
 
     st.markdown("---")
 
     st.subheader("📋 All Comments")
 
-    comments_data = []
-    for comment in comments:
-        comments_data.append(
-            {
-                "User": comment.get("user_name", "Unknown"),
-                "Comment": comment.get("comment_text", ""),
-                "Date": comment.get("date_created", "N/A"),
-                "Likes": comment.get("likes_count", 0),
-                "Replies": comment.get("replies_count", 0),
-                "Sentiment": comment.get("sentiment", "N/A"),
-                "Emotion": comment.get("emotion", "N/A"),
-                "Confidence": f"{comment.get('confidence', 0):.2f}",
-            }
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sentiment_filter = st.multiselect(
+            "Sentiment", list(comments_df["sentiment"].cat.categories)
         )
+        emotion_filter = st.multiselect(
+            "Emotion", list(comments_df["emotion"].cat.categories)
+        )
+    with col2:
+        min_confidence = st.slider("Min confidence", 0.0, 1.0, 0.0, 0.05)
+        min_likes = st.number_input("Min likes", min_value=0, value=0, step=1)
+    with col3:
+        dates = comments_df["date_created"].dropna()
+        date_range = ()
+        if len(dates):
+            date_range = st.date_input(
+                "Date range",
+                (dates.min().date(), dates.max().date()),
+                min_value=dates.min().date(),
+                max_value=dates.max().date(),
+            )
+        sort_by = st.selectbox(
+            "Sort by",
+            list(COMMENT_TABLE_COLUMNS),
+            index=list(COMMENT_TABLE_COLUMNS).index("date_created"),
+            format_func=COMMENT_TABLE_COLUMNS.get,
+        )
+        descending = st.toggle("Descending", value=True)
 
-    comments_df = pd.DataFrame(comments_data)
-    st.dataframe(comments_df, use_container_width=True, height=400)
+    # A half-picked range (one date) only sets the start
+    start = date_range[0] if len(date_range) > 0 else None
+    end = date_range[1] if len(date_range) > 1 else None
+    matching = filter_comments(
+        comments_df,
+        sentiments=sentiment_filter,
+        emotions=emotion_filter,
+        min_confidence=min_confidence,
+        min_likes=min_likes,
+        start=start,
+        end=end,
+    )
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+    pages = max(1, -(-len(matching) // page_size))
+    with col2:
+        page = st.number_input(
+            f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1
+        )
+
+    rows, _ = page_of(
+        matching,
+        sort_by=sort_by,
+        ascending=not descending,
+        page=page,
+        page_size=page_size,
+    )
+    first_row = (page - 1) * page_size + 1 if len(matching) else 0
+    st.caption(
+        f"Showing {first_row}-{first_row + len(rows) - 1 if len(rows) else 0} "
+        f"of {len(matching)} matching comments ({len(comments_df)} total)"
+    )
+    # Only the visible page is sent to the browser
+    st.dataframe(
+        rows[list(COMMENT_TABLE_COLUMNS)].rename(columns=COMMENT_TABLE_COLUMNS),
+        use_container_width=True,
+        hide_index=True,
+        column_config={"Confidence": st.column_config.NumberColumn(format="%.2f")},
+    )
 
     st.markdown("---")
 
     st.subheader("📏 Comment Length Distribution")
-    comments_df["Length"] = comments_df["Comment"].str.len()
-    fig = px.histogram(
-        comments_df,
-        x="Length",
-        nbins=20,
-        title="Distribution of Comment Lengths",
-        labels={"Length": "Characters", "count": "Number of Comments"},
+    fig = histogram_chart(
+        analytics["length_histogram"],
+        "Distribution of Comment Lengths",
+        "Characters",
     )
     st.plotly_chart(fig, use_container_width=True)
 
     st.subheader("⏰ Comments Timeline")
-    comments_df["DateTime"] = pd.to_datetime(comments_df["Date"])
-    comments_df["Hour"] = comments_df["DateTime"].dt.hour
-    hourly_counts = comments_df["Hour"].value_counts().sort_index()
+    hourly_counts = analytics["hourly_counts"]
 
     fig = px.line(
         x=hourly_counts.index,
@@ -309,7 +451,7 @@ elif section == "Sentiment & Emotion":
 
     col1, col2, col3 = st.columns(3)
 
-    sentiment_counts = Counter([c["sentiment"] for c in comments if c.get("sentiment")])
+    sentiment_counts = analytics["sentiment_counts"]
     with col1:
         st.metric("😊 Positive", sentiment_counts.get("Positive", 0))
     with col2:
@@ -324,7 +466,10 @@ elif section == "Sentiment & Emotion":
     with col1:
         st.subheader("📊 Sentiment Distribution")
         sentiment_df = pd.DataFrame(
-            sentiment_counts.items(), columns=["Sentiment", "Count"]
+            {
+                "Sentiment": sentiment_counts.index.astype(str),
+                "Count": sentiment_counts.values,
+            }
         )
         sentiment_emoji_map = {
             "Positive": "😊 Positive",
@@ -351,8 +496,13 @@ elif section == "Sentiment & Emotion":
 
     with col2:
         st.subheader("🎭 Emotion Distribution")
-        emotion_counts = Counter([c["emotion"] for c in comments if c.get("emotion")])
-        emotion_df = pd.DataFrame(emotion_counts.items(), columns=["Emotion", "Count"])
+        emotion_counts = analytics["emotion_counts"]
+        emotion_df = pd.DataFrame(
+            {
+                "Emotion": emotion_counts.index.astype(str),
+                "Count": emotion_counts.values,
+            }
+        )
         emotion_emoji_map = {
             "Joy": "😄 Joy",
             "Anger": "😠 Anger",
@@ -377,17 +527,8 @@ elif section == "Sentiment & Emotion":
     st.markdown("---")
 
     st.subheader("🔍 Sentiment vs Emotion Heatmap")
-    sentiment_emotion_data = []
-    for comment in comments:
-        if comment.get("sentiment") and comment.get("emotion"):
-            sentiment_emotion_data.append(
-                {"Sentiment": comment["sentiment"], "Emotion": comment["emotion"]}
-            )
-
-    if sentiment_emotion_data:
-        se_df = pd.DataFrame(sentiment_emotion_data)
-        heatmap_data = pd.crosstab(se_df["Sentiment"], se_df["Emotion"])
-
+    heatmap_data = analytics["crosstab"]
+    if not heatmap_data.empty:
         fig = px.imshow(
             heatmap_data,
             labels=dict(x="Emotion", y="Sentiment", color="Count"),
@@ -399,17 +540,15 @@ elif section == "Sentiment & Emotion":
         st.plotly_chart(fig, use_container_width=True)
 
     st.subheader("📈 Confidence Score Distribution")
-    confidence_scores = [c["confidence"] for c in comments if c.get("confidence")]
-    if confidence_scores:
-        fig = px.histogram(
-            confidence_scores,
-            nbins=20,
-            title="Distribution of ML Confidence Scores",
-            labels={"value": "Confidence Score", "count": "Number of Comments"},
+    avg_confidence = analytics["average_confidence"]
+    if avg_confidence is not None:
+        fig = histogram_chart(
+            analytics["confidence_histogram"],
+            "Distribution of ML Confidence Scores",
+            "Confidence Score",
         )
         st.plotly_chart(fig, use_container_width=True)
 
-        avg_confidence = sum(confidence_scores) / len(confidence_scores)
         st.info(f"Average Confidence Score: {avg_confidence:.2%}")
 
 # ============ ENGAGEMENT METRICS SECTION ============
@@ -522,20 +661,13 @@ elif section == "Engagement Metrics":
                 )
 
     st.subheader("💬 Comment Engagement Details")
-    comments_with_likes = [c for c in comments if c.get("likes_count", 0) > 0]
-    comments_with_replies = [c for c in comments if c.get("replies_count", 0) > 0]
-
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Comments with Likes", len(comments_with_likes))
+        st.metric("Comments with Likes", analytics["with_likes"])
     with col2:
-        st.metric("Comments with Replies", len(comments_with_replies))
+        st.metric("Comments with Replies", analytics["with_replies"])
     with col3:
-        avg_comment_length = (
-            sum([len(c.get("comment_text", "")) for c in comments]) / len(comments)
-            if comments
-            else 0
-        )
+        avg_comment_length = analytics["average_length"]
         st.metric("Avg Comment Length", f"{avg_comment_length:.0f} chars")
 
 st.markdown("---")
@@ -0,0 +1,203 @@
+import os
+import re
+import json
+
+from output_formats import load_output, metadata_path
+
+
+DEFAULT_DATA_DIR = "data"
+INDEX_PATH = os.path.join(".cache", "dashboard_index.json")
+
+# Bytes read from each end of a .json output to index it; scraped_at,
+# post_url and the post come first, statistics last, comments in between
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 4 * 1024
+
+OUTPUT_EXTENSIONS = (".json", ".jsonl", ".parquet")
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file; changes whenever the file is rewritten"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def is_output_file(name):
+    # Skip jsonl/parquet metadata sidecars and --watch sentiment histories
+    return name.endswith(OUTPUT_EXTENSIONS) and not name.endswith(
+        (".post.json", ".snapshots.jsonl")
+    )
+
+
+def _string_field(text, name):
+    match = re.search(rf'"{name}":\s*"((?:[^"\\]|\\.)*)"', text)
+    return json.loads(f'"{match.group(1)}"') if match else None
+
+
+def _value_field(text, name):
+    match = re.search(rf'"{name}":\s*("(?:[^"\\]|\\.)*"|-?\d+)', text)
+    return json.loads(match.group(1)) if match else None
+
+
+def _is_combined(head):
+    """Whether a .json head is a --urls-file output (scraped_at, then posts)"""
+    posts = head.find('"posts":')
+    post_url = head.find('"post_url":')
+    return posts != -1 and (post_url == -1 or posts < post_url)
+
+
+def _read_ends(path):
+    with open(path, "rb") as f:
+        head = f.read(HEAD_BYTES)
+        size = f.seek(0, os.SEEK_END)
+        if size <= len(head):
+            tail = head[-TAIL_BYTES:]
+        else:
+            f.seek(max(len(head), size - TAIL_BYTES))
+            tail = f.read()
+    return head.decode("utf-8", "ignore"), tail.decode("utf-8", "ignore")
+
+
+def index_file(path):
+    """
+    Lightweight summary of one output file
+
+    .json outputs are indexed from their first and last few kilobytes, so
+    the comments are never parsed. .jsonl/.parquet outputs are indexed from
+    their small .post.json metadata file.
+
+    Returns:
+        dict: post_id, post_url, scraped_at, author, comments, likes, shares
+    """
+    if path.endswith(".json"):
+        head, tail = _read_ends(path)
+        if _is_combined(head):
+            raise ValueError("combined --urls-file output, not a single post")
+        statistics = {}
+        start = tail.rfind('"statistics":')
+        if start != -1:
+            try:
+                statistics, _ = json.JSONDecoder().raw_decode(
+                    tail[start + len('"statistics":') :].lstrip()
+                )
+            except json.JSONDecodeError:
+                statistics = {}
+        post_url = _string_field(head, "post_url")
+        return {
+            "post_id": _value_field(head, "post_id") or post_url,
+            "post_url": post_url,
+            "scraped_at": _string_field(head, "scraped_at"),
+            "author": _string_field(head, "author"),
+            "comments": statistics.get("total_comments_scraped", 0),
+            "likes": statistics.get("post_likes", 0),
+            "shares": statistics.get("post_shares", 0),
+        }
+
+    with open(metadata_path(path), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    post = metadata.get("post") or {}
+    statistics = metadata.get("statistics", {})
+    return {
+        "post_id": (post.get("raw_data") or {}).get("post_id")
+        or metadata.get("post_url"),
+        "post_url": metadata.get("post_url"),
+        "scraped_at": metadata.get("scraped_at"),
+        "author": post.get("author"),
+        "comments": statistics.get("total_comments_scraped", 0),
+        "likes": statistics.get("post_likes", 0),
+        "shares": statistics.get("post_shares", 0),
+    }
+
+
+class DataStore:
+    """
+    Index of the scraper outputs in a directory
+
+    scan() only stats the files; a file is (re)indexed when its mtime or
+    size differs from the persisted index, so rescanning thousands of
+    outputs costs one stat each. Posts themselves are loaded on demand with
+    load().
+
+    Args:
+        directory: Folder holding .json/.jsonl/.parquet outputs
+        index_path: JSON file the index is persisted to between runs
+    """
+
+    def __init__(self, directory=DEFAULT_DATA_DIR, index_path=INDEX_PATH):
+        self.directory = directory
+        self.index_path = index_path
+        self.entries = {}
+
+    def load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_index(self, entries):
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
+
+    def scan(self):
+        """
+        Refresh the index from the directory
+
+        Returns:
+            list: Index entries (each with path, mtime_ns, size and the
+            fields of index_file()), newest scrape first
+        """
+        previous = self.load_index()
+        entries = {}
+        changed = False
+
+        if os.path.isdir(self.directory):
+            with os.scandir(self.directory) as files:
+                for item in files:
+                    if not item.is_file() or not is_output_file(item.name):
+                        continue
+                    stat = item.stat()
+                    entry = previous.get(item.path)
+                    if (
+                        entry is None
+                        or entry["mtime_ns"] != stat.st_mtime_ns
+                        or entry["size"] != stat.st_size
+                    ):
+                        try:
+                            summary = index_file(item.path)
+                        except OSError as e:
+                            print(f"Skipping {item.path}: {e}")
+                            continue
+                        except ValueError as e:
+                            # Remembered so the file is not reread (and
+                            # reported) on every scan until it changes
+                            print(f"Skipping {item.path}: {e}")
+                            summary = {"skipped": str(e)}
+                        entry = {
+                            "path": item.path,
+                            "mtime_ns": stat.st_mtime_ns,
+                            "size": stat.st_size,
+                            **summary,
+                        }
+                        changed = True
+                    entries[item.path] = entry
+
+        if changed or entries.keys() != previous.keys():
+            self.save_index(entries)
+
+        self.entries = entries
+        return sorted(
+            (entry for entry in entries.values() if "skipped" not in entry),
+            key=lambda entry: entry.get("scraped_at") or "",
+            reverse=True,
+        )
+
+    @staticmethod
+    def load(path):
+        """Full output document for one post, in any output format"""
+        return load_output(path)
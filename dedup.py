@@ -0,0 +1,207 @@
+import re
+import zlib
+import random
+import hashlib
+import unicodedata
+
+
+# Variation selectors only change how an emoji renders, not what it means;
+# apostrophes are dropped so "don't" stays one word
+IGNORED_CHARS = dict.fromkeys([0xFE0E, 0xFE0F, ord("'"), ord("\u2019")])
+
+# Words that flip a comment's meaning; near-duplicates whose negations
+# differ are never grouped
+NEGATIONS = frozenset(
+    unicodedata.normalize("NFKC", word)
+    for word in [
+        "not",
+        "no",
+        "never",
+        "nothing",
+        "nobody",
+        "none",
+        "nor",
+        "dont",
+        "doesnt",
+        "didnt",
+        "isnt",
+        "wasnt",
+        "arent",
+        "cant",
+        "cannot",
+        "wont",
+        "না",
+        "নয়",
+        "নেই",
+        "নাই",
+        "নি",
+        "কখনো",
+    ]
+)
+# Bengali negation is often fused onto the verb: "করিনি", "চাইনা"
+NEGATION_SUFFIXES = ("না", "নি", "নাই")
+
+# MinHash signature length and LSH banding; 8 bands of 4 rows make texts
+# with roughly 60% shingle overlap or more likely to share a bucket
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+
+# Long comments are almost never copy-pasted slogans; exact matching is
+# enough for them and skips the MinHash cost
+MAX_NEAR_DUP_LENGTH = 300
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE))
+    for _ in range(NUM_PERM)
+]
+
+
+def normalize_for_dedup(text):
+    """
+    Canonical form of a comment for duplicate detection
+
+    NFKC, lowercase, drops variation selectors and punctuation, collapses
+    spacing, squeezes repeated emoji/symbols to one and letters (not digits)
+    repeated three or more times to one, so "🌾🌾🌾", "🌾 🌾🌾🌾!" and "🌾" compare
+    equal. Words and emoji themselves are kept, so "great" and "not great",
+    or "Shame on you" and "Shame on you 😂", stay different.
+    """
+    text = unicodedata.normalize("NFKC", text).lower().translate(IGNORED_CHARS)
+    text = "".join(
+        " " if unicodedata.category(char).startswith("P") else char for char in text
+    )
+
+    words = []
+    for word in text.split():
+        kept = []
+        for char in word:
+            if kept and kept[-1] == char and not char.isalnum():
+                continue
+            kept.append(char)
+        # Letters only: "1000" and "10" are different numbers
+        word = re.sub(r"([^\W\d_])\1{2,}", r"\1", "".join(kept))
+        # "🌾 🌾" is the same repeat as "🌾🌾"
+        if words and words[-1] == word and not any(c.isalnum() for c in word):
+            continue
+        words.append(word)
+    return " ".join(words)
+
+
+def meaning_markers(normalized):
+    """
+    Negation words and emoji/symbols of a normalized comment
+
+    Two comments can share most of their characters and still mean the
+    opposite ("… সমর্থন করি" / "… সমর্থন করি না", "Shame on you" /
+    "Shame on you 😂"); near-duplicates must have equal markers.
+    """
+    words = normalized.split()
+    return (
+        sorted(
+            word
+            for word in words
+            if word in NEGATIONS or word.endswith(NEGATION_SUFFIXES)
+        ),
+        sorted({char for char in normalized if unicodedata.category(char) == "So"}),
+    )
+
+
+def shingles(text, size=3):
+    if len(text) <= size:
+        return {text}
+    return {text[start : start + size] for start in range(len(text) - size + 1)}
+
+
+def minhash(shingle_set):
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set]
+    return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class DedupIndex:
+    """
+    Online grouping of duplicate comments
+
+    Comments are assigned one at a time, so the index can sit inside a
+    streaming pipeline. The first comment of every group is its
+    representative; only representatives need to be analyzed. Comments are
+    grouped when normalize_for_dedup() makes them equal; with a threshold,
+    also when they are near-duplicates with the same meaning_markers().
+
+    Args:
+        threshold: Minimum shingle Jaccard similarity to a representative
+            for a comment to join its group, or None to group exact
+            duplicates only
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold
+        self.exact = {}
+        self.buckets = {}
+        self.representatives = {}
+        self.total = 0
+        self.groups = 0
+
+    def assign(self, key, text):
+        """
+        Place a comment in a group
+
+        Args:
+            key: Caller's identifier for the comment, e.g. its index
+            text: Comment text
+
+        Returns:
+            The key of the group's representative, which is key itself if
+            this comment starts a new group
+        """
+        self.total += 1
+        normalized = normalize_for_dedup(text)
+        digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+
+        if digest in self.exact:
+            return self.exact[digest]
+
+        representative = None
+        bands = []
+        comment_shingles = None
+
+        if self.threshold and normalized and len(normalized) <= MAX_NEAR_DUP_LENGTH:
+            markers = meaning_markers(normalized)
+            comment_shingles = shingles(normalized)
+            signature = minhash(comment_shingles)
+            bands = [
+                (band, tuple(signature[band * ROWS : (band + 1) * ROWS]))
+                for band in range(BANDS)
+            ]
+            candidates = []
+            for band in bands:
+                candidates.extend(self.buckets.get(band, ()))
+            for candidate in dict.fromkeys(candidates):
+                candidate_shingles, candidate_markers = self.representatives[candidate]
+                if (
+                    candidate_markers == markers
+                    and jaccard(comment_shingles, candidate_shingles) >= self.threshold
+                ):
+                    representative = candidate
+                    break
+
+        if representative is None:
+            representative = key
+            self.groups += 1
+            if comment_shingles is not None:
+                self.representatives[key] = (comment_shingles, markers)
+                for band in bands:
+                    self.buckets.setdefault(band, []).append(key)
+
+        self.exact[digest] = representative
+        return representative
+
+    def ratio(self):
+        """Share of assigned comments that were duplicates of another"""
+        return 1 - self.groups / self.total if self.total else 0.0
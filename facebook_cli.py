@@ -1,11 +1,32 @@
 import os
-import requests
-import time
+import re
+import sys
 import json
+import hashlib
+import time
+import cProfile
+import pstats
 import argparse
+import threading
 import load_dotenv
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from openai import OpenAI
+from openai import OpenAI, BadRequestError, RateLimitError
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+from brightdata_client import BrightDataClient, SnapshotError, BRIGHTDATA_BASE_URL
+from sentiment_cache import SentimentCache
+from dedup import DedupIndex
+from local_classifier import LocalSentimentModel, DEFAULT_MODEL_PATH
+from local_classifier import SENTIMENTS, EMOTIONS
+from snapshot_poller import SnapshotPoller
+from pipeline import Pipeline, Stage
+from output_formats import FORMATS, save_output, output_extension, metadata_path
+from output_formats import format_of, load_output, OutputWriter
+from checkpoint import CheckpointJournal, find_run, record_run, finish_run
+from rate_limiter import LLMScheduler, RateLimitedError
+from metrics import Metrics
+from watcher import PostWatcher
 
 
 load_dotenv.load_dotenv()
@@ -15,158 +36,634 @@ POST_DATASET_ID = os.getenv("POST_DATASET_ID")
 COMMENTS_DATASET_ID = os.getenv("COMMENTS_DATASET_ID")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
+# API roots, overridable to point runs at local stand-ins (see benchmark.py)
+BRIGHTDATA_BASE_URL = os.getenv("BRIGHTDATA_BASE_URL", BRIGHTDATA_BASE_URL)
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+# Shared BrightData client, pooling connections across every call of a run
+brightdata = BrightDataClient(BRIGHTDATA_API_KEY, base_url=BRIGHTDATA_BASE_URL)
+
 # Initialize OpenRouter client
 client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
+    base_url=OPENROUTER_BASE_URL,
     api_key=OPENROUTER_API_KEY,
+    # Retries are owned by the scheduler, which also adapts concurrency
+    max_retries=0,
 )
 
+# Rate-limit-aware gate in front of every LLM call; main() rebuilds it from
+# --concurrency, --rpm and --tpm
+scheduler = LLMScheduler()
 
-def trigger_brightdata_scrape(url, dataset_id, limit_records=None):
-    """Trigger a BrightData scraping job"""
-    trigger_url = "https://api.brightdata.com/datasets/v3/trigger"
-    headers = {
-        "Authorization": f"Bearer {BRIGHTDATA_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    params = {
-        "dataset_id": dataset_id,
-        "include_errors": "true",
+SENTIMENT_MODEL = "google/gemini-2.5-flash"
+# Bump whenever the prompts change so cached results are not reused
+PROMPT_VERSION = 3
+
+# USD per million tokens for SENTIMENT_MODEL on OpenRouter, used for the
+# run's cost estimate; cached prompt tokens are billed at a discount
+PRICE_PER_M_INPUT = 0.30
+PRICE_PER_M_CACHED_INPUT = 0.075
+PRICE_PER_M_OUTPUT = 2.50
+
+# Instructions go first and the post second, so that every request for a
+# post shares the same prefix and only the comment part changes
+SINGLE_INSTRUCTIONS = """Analyze the sentiment and emotion of the user comment in response to the post.
+
+Respond ONLY with a JSON object in this exact format:
+{
+  "sentiment": "Positive" or "Negative" or "Neutral",
+  "emotion": "Joy" or "Anger" or "Sadness" or "Fear" or "Surprise" or "Neutral",
+  "confidence": 0.0 to 1.0
+}"""
+
+BATCH_INSTRUCTIONS = """Analyze the sentiment and emotion of each numbered user comment in response to the post.
+
+Respond ONLY with a JSON object holding one result per comment, in this exact format:
+{
+  "results": [
+    {
+      "id": comment number,
+      "sentiment": "Positive" or "Negative" or "Neutral",
+      "emotion": "Joy" or "Anger" or "Sadness" or "Fear" or "Surprise" or "Neutral",
+      "confidence": 0.0 to 1.0
     }
+  ]
+}"""
+
+SENTIMENT_LABELS = {label.lower(): label for label in SENTIMENTS}
+EMOTION_LABELS = {label.lower(): label for label in EMOTIONS}
+
+_SENTIMENT_PROPERTIES = {
+    "sentiment": {"type": "string", "enum": list(SENTIMENTS)},
+    "emotion": {"type": "string", "enum": list(EMOTIONS)},
+    "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+}
+
+# JSON schemas passed as response_format to constrain replies
+SENTIMENT_SCHEMA = {
+    "name": "comment_sentiment",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": _SENTIMENT_PROPERTIES,
+        "required": ["sentiment", "emotion", "confidence"],
+        "additionalProperties": False,
+    },
+}
+
+BATCH_SCHEMA = {
+    "name": "comment_sentiments",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"id": {"type": "integer"}, **_SENTIMENT_PROPERTIES},
+                    "required": ["id", "sentiment", "emotion", "confidence"],
+                    "additionalProperties": False,
+                },
+            }
+        },
+        "required": ["results"],
+        "additionalProperties": False,
+    },
+}
+
+# Use response_format JSON schemas; switched off automatically if the
+# provider rejects them
+structured_output = True
+
+# Words in a 400 reply that mean the provider rejected the schema itself,
+# rather than the request (e.g. a prompt over the context length)
+STRUCTURED_OUTPUT_ERRORS = (
+    "response_format",
+    "json_schema",
+    "json schema",
+    "structured output",
+)
 
-    data = [{"url": url}]
+# Extra attempts for a single comment whose reply fails validation
+PARSE_RETRIES = 1
+OPENROUTER_HEADERS = {
+    "HTTP-Referer": "https://facebook-scraper",
+    "X-Title": "Facebook Sentiment Analyzer",
+}
+
+# Prompt budget for one batched request. Gemini 2.5 Flash accepts far more,
+# but smaller requests keep latency low and a bad reply cheap to retry.
+MAX_PROMPT_TOKENS = 16000
+# Rough reply size per comment in a batch, reserved out of the budget
+TOKENS_PER_RESULT = 40
+# How many times missing batch items are re-queued before falling back
+# to one request per comment
+BATCH_RETRIES = 2
+
+# Persistent sentiment cache, opened in main() unless --no-cache is given
+cache = None
+
+# Local first-tier classifier, loaded in main() when --local-threshold is given.
+# Comments it labels at or above local_threshold never reach the LLM.
+local_model = None
+local_threshold = 1.0
+
+# Exact duplicates (after normalize_for_dedup) share one analysis unless
+# --no-dedup; near-duplicates only with --near-duplicates, at this minimum
+# similarity
+dedup = True
+dedup_threshold = None
+
+# Counters for the run summary, shared by the analysis worker threads
+run_stats = Counter()
+stats_lock = threading.Lock()
+
+
+# Stage timers and latency histograms, exported with --metrics/--prometheus
+metrics = Metrics()
+
+
+def count_stat(name, amount=1):
+    with stats_lock:
+        run_stats[name] += amount
+
+
+def trigger_brightdata_scrape(url, dataset_id, limit_records=None):
+    """Trigger a BrightData scraping job"""
+    data = {"url": url}
     if limit_records:
-        data[0]["limit_records"] = limit_records
+        data["limit_records"] = limit_records
 
-    response = requests.post(trigger_url, headers=headers, params=params, json=data)
+    return trigger_brightdata_bulk([data], dataset_id)
 
-    if response.status_code == 200:
-        return response.json().get("snapshot_id")
-    else:
-        print(f"Error triggering scrape: {response.text}")
-        return None
+
+def trigger_brightdata_bulk(inputs, dataset_id):
+    """Trigger one BrightData scraping job covering several inputs"""
+    with metrics.timer("trigger"):
+        return brightdata.trigger(inputs, dataset_id)
 
 
 def check_scrape_progress(snapshot_id):
     """Check the progress of a BrightData scraping job"""
-    url = f"https://api.brightdata.com/datasets/v3/progress/{snapshot_id}"
-    headers = {
-        "Authorization": f"Bearer {BRIGHTDATA_API_KEY}",
-    }
+    return fetch_scrape_progress(snapshot_id)[0]
 
-    response = requests.get(url, headers=headers)
 
-    if response.status_code == 200:
-        return response.json().get("status")
-    else:
-        return None
+def fetch_scrape_progress(snapshot_id):
+    """Check the progress of a BrightData scraping job, with its Retry-After"""
+    count_stat("brightdata_polls")
+    started = time.perf_counter()
+    progress = brightdata.progress(snapshot_id)
+    metrics.observe("brightdata_poll_latency_seconds", time.perf_counter() - started)
+    if progress[0] is None:
+        count_stat("brightdata_poll_errors")
+    return progress
 
 
 def get_scrape_results(snapshot_id):
     """Get the results of a completed BrightData scraping job"""
-    url = f"https://api.brightdata.com/datasets/v3/snapshot/{snapshot_id}"
-    headers = {
-        "Authorization": f"Bearer {BRIGHTDATA_API_KEY}",
-    }
-    params = {
-        "format": "json",
-    }
+    with metrics.timer("download"):
+        return brightdata.results(snapshot_id)
 
-    response = requests.get(url, headers=headers, params=params)
 
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Error getting results: {response.text}")
+def iter_scrape_results(snapshot_id):
+    """Stream the records of a completed BrightData scraping job"""
+    # Only the waits for records count as download time; the consumer's
+    # own processing is timed by its pipeline stages
+    return metrics.timed_iter("download", brightdata.iter_results(snapshot_id))
+
+
+def extract_json(result):
+    """
+    Parse the JSON value in an LLM reply
+
+    Slices from the first opening bracket to the last closing one, which
+    drops markdown code fences and stray prose without splitting the reply.
+
+    Raises:
+        ValueError: if the reply holds no parseable JSON
+    """
+    starts = [pos for pos in (result.find("{"), result.find("[")) if pos != -1]
+    if not starts:
+        raise ValueError("no JSON in reply")
+    start = min(starts)
+    end = result.rfind("}" if result[start] == "{" else "]")
+    if end < start:
+        raise ValueError("unterminated JSON in reply")
+    return json.loads(result[start : end + 1])
+
+
+def validate_sentiment(item):
+    """
+    Strictly check one sentiment object from a reply
+
+    Label casing and surrounding whitespace are normalized; anything else
+    off-schema (unknown labels, missing or out-of-range confidence) fails.
+
+    Returns:
+        dict: sentiment, emotion and confidence, or None if invalid
+    """
+    if not isinstance(item, dict):
+        return None
+
+    sentiment = SENTIMENT_LABELS.get(str(item.get("sentiment", "")).strip().lower())
+    emotion = EMOTION_LABELS.get(str(item.get("emotion", "")).strip().lower())
+    try:
+        confidence = float(item.get("confidence"))
+    except (TypeError, ValueError):
+        return None
+
+    if sentiment is None or emotion is None or not 0.0 <= confidence <= 1.0:
         return None
 
+    return {"sentiment": sentiment, "emotion": emotion, "confidence": confidence}
+
+
+def estimate_tokens(text):
+    """Cheap token estimate; Bengali script tokenizes far denser than English"""
+    return len(text) // 2 + 1
+
+
+def cache_key(post_content, comment_text):
+    return SentimentCache.make_key(
+        SENTIMENT_MODEL, PROMPT_VERSION, post_content, comment_text
+    )
+
+
+def build_messages(instructions, post_content, suffix):
+    """
+    Lay a request out as a stable prefix (instructions, then the post) and a
+    variable suffix (the comments), so providers that cache prompt prefixes
+    can reuse the post tokens across every request for the same post
+    """
+    return [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": f"POST:\n{post_content}"},
+        {"role": "user", "content": suffix},
+    ]
+
+
+def record_usage(completion):
+    """Add a completion's token usage to the run counters"""
+    usage = getattr(completion, "usage", None)
+    count_stat("llm_calls")
+    if not usage:
+        return
+
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) if details else 0
+
+    count_stat("prompt_tokens", usage.prompt_tokens or 0)
+    count_stat("completion_tokens", usage.completion_tokens or 0)
+    count_stat("cached_tokens", cached or 0)
+
+
+def estimate_cost():
+    """Estimated USD spend of this run from the recorded token counts"""
+    uncached = run_stats["prompt_tokens"] - run_stats["cached_tokens"]
+    return (
+        uncached * PRICE_PER_M_INPUT
+        + run_stats["cached_tokens"] * PRICE_PER_M_CACHED_INPUT
+        + run_stats["completion_tokens"] * PRICE_PER_M_OUTPUT
+    ) / 1_000_000
+
+
+def is_transient_error(error):
+    """Connection problems, timeouts and 5xx replies are worth retrying"""
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def send_completion(request):
+    """One raw chat completion, in the shape LLMScheduler.call() expects"""
+    started = time.perf_counter()
+    try:
+        completion = client.chat.completions.create(**request)
+    except RateLimitError as e:
+        count_stat("llm_rate_limited")
+        retry_after = e.response.headers.get("retry-after") if e.response else None
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None
+        raise RateLimitedError(retry_after) from e
+    except Exception:
+        count_stat("llm_errors")
+        raise
+    finally:
+        metrics.observe("llm_latency_seconds", time.perf_counter() - started)
+
+    usage = getattr(completion, "usage", None)
+    return completion, getattr(usage, "total_tokens", 0) or 0
+
+
+def call_llm(messages, schema=None):
+    """
+    Send one chat completion to OpenRouter and return the reply text
+
+    The request goes through the scheduler, which enforces the rate limits
+    and retries 429s and transient errors. With a schema, the reply is
+    constrained to it through response_format. If the provider rejects
+    response_format, structured output is switched off for the rest of the
+    run and the request is sent again without it; other 400s are raised.
+    """
+    global structured_output
+
+    request = {
+        "extra_headers": OPENROUTER_HEADERS,
+        "model": SENTIMENT_MODEL,
+        "messages": messages,
+    }
+    if schema and structured_output:
+        request["response_format"] = {"type": "json_schema", "json_schema": schema}
+
+    estimated = sum(estimate_tokens(m["content"]) for m in messages) + 100
+
+    try:
+        completion = scheduler.call(
+            lambda: send_completion(request), estimated, is_transient_error
+        )
+    except BadRequestError as e:
+        message = str(e).lower()
+        if "response_format" not in request or not any(
+            words in message for words in STRUCTURED_OUTPUT_ERRORS
+        ):
+            raise
+        print(f"    Structured output rejected, falling back to plain JSON: {e}")
+        structured_output = False
+        del request["response_format"]
+        completion = scheduler.call(
+            lambda: send_completion(request), estimated, is_transient_error
+        )
+
+    record_usage(completion)
+    return completion.choices[0].message.content
+
 
-def analyze_sentiment(post_content, comment_text):
+def analyze_sentiment(post_content, comment_text, use_cache=True):
     """
     Analyze sentiment of a comment using OpenRouter LLM
 
+    Replies that fail validation are retried up to PARSE_RETRIES times
+    before the comment is counted as failed.
+
     Args:
         post_content: The original post text
         comment_text: The comment text to analyze
+        use_cache: Look the comment up in the sentiment cache first
 
     Returns:
-        dict: Sentiment analysis with sentiment, emotion, and confidence
+        dict: Sentiment analysis with sentiment, emotion, and confidence, plus
+        label_source "llm" unless the analysis failed
     """
+    if cache and use_cache:
+        cached = cache.get(cache_key(post_content, comment_text))
+        if cached is not None:
+            return {**cached, "label_source": "llm"}
+
+    messages = build_messages(
+        SINGLE_INSTRUCTIONS, post_content, f"USER COMMENT:\n{comment_text}"
+    )
+
     try:
-        prompt = f"""Analyze the sentiment and emotion of this user comment in response to the post.
+        for attempt in range(PARSE_RETRIES + 1):
+            try:
+                sentiment_data = validate_sentiment(
+                    extract_json(call_llm(messages, SENTIMENT_SCHEMA))
+                )
+            except ValueError:
+                sentiment_data = None
+
+            if sentiment_data is not None:
+                if cache:
+                    cache.put(cache_key(post_content, comment_text), sentiment_data)
+                return {**sentiment_data, "label_source": "llm"}
+
+            count_stat("invalid_replies")
+            if attempt < PARSE_RETRIES:
+                count_stat("parse_retries")
 
-POST:
-{post_content}
+    except Exception as e:
+        print(f"    Sentiment analysis error: {e}")
+        count_stat("api_errors")
 
-USER COMMENT:
-{comment_text}
+    count_stat("failed_comments")
+    return {"sentiment": "Neutral", "emotion": "Neutral", "confidence": 0.0}
 
-Respond ONLY with a JSON object in this exact format:
-{{
-  "sentiment": "Positive" or "Negative" or "Neutral",
-  "emotion": "Joy" or "Anger" or "Sadness" or "Fear" or "Surprise" or "Neutral",
-  "confidence": 0.0 to 1.0
-}}"""
-
-        completion = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": "https://facebook-scraper",
-                "X-Title": "Facebook Sentiment Analyzer",
-            },
-            model="google/gemini-2.5-flash",
-            messages=[{"role": "user", "content": prompt}],
-        )
 
-        result = completion.choices[0].message.content
+def analyze_sentiment_batch(post_content, comment_texts):
+    """
+    Analyze several comments on the same post with a single LLM request
+
+    The post is sent once and the comments are numbered, so the post tokens
+    are paid for once per batch instead of once per comment.
 
-        # Try to parse JSON response
-        try:
-            # Extract JSON if wrapped in markdown code blocks
-            if "```json" in result:
-                result = result.split("```json")[1].split("```")[0].strip()
-            elif "```" in result:
-                result = result.split("```")[1].split("```")[0].strip()
-
-            sentiment_data = json.loads(result)
-            return sentiment_data
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            return {"sentiment": "Neutral", "emotion": "Neutral", "confidence": 0.5}
+    Args:
+        post_content: The original post text
+        comment_texts: List of comment texts to analyze
+
+    Returns:
+        list: Sentiment dicts in the same order as comment_texts, with None
+        for every comment the reply did not cover or answered off-schema
+    """
+    numbered = "\n".join(
+        f"[{i}] {json.dumps(text, ensure_ascii=False)}"
+        for i, text in enumerate(comment_texts, 1)
+    )
+    messages = build_messages(
+        BATCH_INSTRUCTIONS,
+        post_content,
+        f"USER COMMENTS ({len(comment_texts)}):\n{numbered}",
+    )
+
+    results = [None] * len(comment_texts)
 
+    try:
+        items = extract_json(call_llm(messages, BATCH_SCHEMA))
+    except ValueError:
+        count_stat("invalid_replies")
+        return results
     except Exception as e:
-        print(f"    Sentiment analysis error: {e}")
-        return {"sentiment": "Neutral", "emotion": "Neutral", "confidence": 0.0}
+        print(f"    Batch sentiment analysis error: {e}")
+        count_stat("api_errors")
+        return results
+
+    if isinstance(items, dict):
+        items = items.get("results")
+    if not isinstance(items, list):
+        count_stat("invalid_replies")
+        return results
+
+    # Without ids the reply can only be trusted if it lines up exactly
+    positional = len(items) == len(comment_texts) and not any(
+        isinstance(item, dict) and "id" in item for item in items
+    )
 
+    for pos, item in enumerate(items):
+        sentiment_data = validate_sentiment(item)
+        if sentiment_data is None:
+            count_stat("invalid_items")
+            continue
+        if positional:
+            idx = pos
+        else:
+            try:
+                idx = int(item["id"]) - 1
+            except (KeyError, TypeError, ValueError):
+                count_stat("invalid_items")
+                continue
+        if 0 <= idx < len(results) and results[idx] is None:
+            results[idx] = sentiment_data
 
-def scrape_facebook_post(post_url):
-    """Scrape a Facebook post content"""
-    print("🔄 Scraping post...")
+    return results
 
-    # Trigger the scrape
-    snapshot_id = trigger_brightdata_scrape(post_url, POST_DATASET_ID)
 
-    if not snapshot_id:
-        return None
+def pack_batches(post_content, comment_texts, indices, batch_size):
+    """
+    Group comment indices into batches of at most batch_size comments whose
+    prompt stays under MAX_PROMPT_TOKENS
+    """
+    budget = MAX_PROMPT_TOKENS - estimate_tokens(post_content) - 200
+    batches = []
+    batch = []
+    used = 0
 
-    print(f"   Snapshot ID: {snapshot_id}")
+    for idx in indices:
+        cost = estimate_tokens(comment_texts[idx]) + TOKENS_PER_RESULT
+        if batch and (len(batch) >= batch_size or used + cost > budget):
+            batches.append(batch)
+            batch = []
+            used = 0
+        batch.append(idx)
+        used += cost
 
-    # Wait for completion
-    while True:
-        status = check_scrape_progress(snapshot_id)
-
-        if status == "ready":
-            print("   ✓ Post scraping complete!")
-            break
-        elif status == "failed":
-            print("   ✗ Post scraping failed")
-            return None
+    if batch:
+        batches.append(batch)
 
-        print(f"   Status: {status}...")
-        time.sleep(5)
+    return batches
 
-    # Get results
-    results = get_scrape_results(snapshot_id)
 
+def analyze_group(post_content, comment_texts, batch_size=1):
+    """
+    Analyze a small group of comments serially: cache first, then the local
+    model, then batched requests for whatever is left, then one request per
+    leftover comment
+
+    Returns:
+        list: Sentiment dicts in the same order as comment_texts, each with
+        a label_source of "llm" or "local" (none for failed analyses)
+    """
+    results = [None] * len(comment_texts)
+
+    # Serve what we can from the cache before spending any LLM calls; only
+    # LLM labels are ever cached
+    if cache:
+        for idx, text in enumerate(comment_texts):
+            cached = cache.get(cache_key(post_content, text))
+            if cached is not None:
+                results[idx] = {**cached, "label_source": "llm"}
+    pending = [idx for idx in range(len(comment_texts)) if results[idx] is None]
+
+    # Let the local model take the comments it is confident about
+    if local_model and pending:
+        for idx in pending:
+            prediction = local_model.predict(comment_texts[idx])
+            if prediction["confidence"] >= local_threshold:
+                results[idx] = {**prediction, "label_source": "local"}
+                count_stat("local_hits")
+        pending = [idx for idx in pending if results[idx] is None]
+
+    if batch_size > 1 and len(pending) > 1:
+        for attempt in range(BATCH_RETRIES + 1):
+            replies = analyze_sentiment_batch(
+                post_content, [comment_texts[idx] for idx in pending]
+            )
+            for idx, sentiment_data in zip(pending, replies):
+                if sentiment_data is not None:
+                    results[idx] = {**sentiment_data, "label_source": "llm"}
+                    if cache:
+                        cache.put(
+                            cache_key(post_content, comment_texts[idx]), sentiment_data
+                        )
+
+            # Re-queue only the comments the reply left out
+            pending = [idx for idx in pending if results[idx] is None]
+            if not pending:
+                break
+
+    for idx in pending:
+        results[idx] = analyze_sentiment(
+            post_content, comment_texts[idx], use_cache=False
+        )
+
+    return results
+
+
+def analyze_comments(post_content, comment_texts, concurrency=8, batch_size=1):
+    """
+    Analyze sentiment for many comments concurrently
+
+    Args:
+        post_content: The original post text
+        comment_texts: List of comment texts to analyze
+        concurrency: Maximum number of in-flight LLM requests
+        batch_size: Comments per LLM request; 1 sends each comment on its own
+
+    Returns:
+        list: Sentiment dicts in the same order as comment_texts
+    """
+    total = len(comment_texts)
+    results = [None] * total
+    done = 0
+
+    groups = pack_batches(post_content, comment_texts, range(total), batch_size)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(
+                analyze_group,
+                post_content,
+                [comment_texts[idx] for idx in group],
+                batch_size,
+            ): group
+            for group in groups
+        }
+        for future in as_completed(futures):
+            group = futures[future]
+            for idx, sentiment_data in zip(group, future.result()):
+                results[idx] = sentiment_data
+
+            before = done
+            done += len(group)
+            if done // 10 > before // 10 or done == total:
+                print(f"   Analyzing... {done}/{total}")
+
+    return results
+
+
+def wait_for_snapshots(snapshots):
+    """
+    Poll several BrightData snapshots together until each is ready or failed
+
+    Args:
+        snapshots: Dict mapping a label (e.g. "Post") to a snapshot ID
+
+    Returns:
+        dict: label -> True if the snapshot is ready, False if it failed
+    """
+    poller = SnapshotPoller(fetch_scrape_progress)
+    futures = {
+        label: poller.add(snapshot_id, label=label)
+        for label, snapshot_id in snapshots.items()
+    }
+    with metrics.timer("poll_wait"):
+        poller.run()
+    return {label: future.result() for label, future in futures.items()}
+
+
+def build_post_data(results, post_url):
+    """Shape the first record of a post snapshot into post_data"""
     if results and len(results) > 0:
         post = results[0]
         return {
@@ -183,172 +680,946 @@ def scrape_facebook_post(post_url):
     return None
 
 
-def scrape_facebook_comments(
-    post_url, limit_records=100, post_content="", analyze=True
-):
-    """Scrape comments from a Facebook post"""
-    print(f"🔄 Scraping comments (limit: {limit_records})...")
+def normalize_comment(comment):
+    """Shape one BrightData comment record into comment_data"""
+    return {
+        "user_name": comment.get("user_name", "Unknown"),
+        "user_url": comment.get("user_url", ""),
+        "date_created": comment.get("date_created", ""),
+        "comment_text": comment.get("comment_text", ""),
+        "likes_count": comment.get("likes_count", 0),
+        "replies_count": comment.get("replies_count", 0),
+        "sentiment": "Neutral",
+        "emotion": "Neutral",
+        "confidence": 0.0,
+        # "llm", "local" (first-tier model) or "dedup" (copied from a
+        # duplicate); None while unanalyzed or after a failed analysis
+        "label_source": None,
+    }
 
-    # Trigger the scrape
-    snapshot_id = trigger_brightdata_scrape(
-        post_url, COMMENTS_DATASET_ID, limit_records
-    )
 
-    if not snapshot_id:
-        return None
+def comment_fingerprint(comment_data):
+    """Identity of a comment across scrapes: author, timestamp and text hash"""
+    text_hash = hashlib.sha1(
+        comment_data.get("comment_text", "").encode("utf-8")
+    ).hexdigest()
+    return (
+        f"{comment_data.get('user_url', '')}|"
+        f"{comment_data.get('date_created', '')}|{text_hash}"
+    )
 
-    print(f"   Snapshot ID: {snapshot_id}")
 
-    # Wait for completion
-    while True:
-        status = check_scrape_progress(snapshot_id)
-
-        if status == "ready":
-            print("   ✓ Comments scraping complete!")
-            break
-        elif status == "failed":
-            print("   ✗ Comments scraping failed")
-            return None
+def index_comments(comments_data):
+    """Dict of comment fingerprint -> comment_data, for known= and merging"""
+    return {comment_fingerprint(comment): comment for comment in comments_data}
 
-        print(f"   Status: {status}...")
-        time.sleep(5)
 
-    # Get results
-    results = get_scrape_results(snapshot_id)
+def merge_comments(comments_data, previous_comments):
+    """
+    Fresh comments followed by previous ones the new scrape did not return
 
-    if results:
-        comments_list = []
-        total = len(results)
+    Comments drop out of a scrape when they are deleted or fall beyond the
+    -n limit; an update keeps them rather than losing their analysis.
+    """
+    seen = {comment_fingerprint(comment) for comment in comments_data}
+    return comments_data + [
+        comment
+        for comment in previous_comments
+        if comment_fingerprint(comment) not in seen
+    ]
+
+
+def build_comments_data(
+    results,
+    post_content="",
+    analyze=True,
+    concurrency=8,
+    batch_size=1,
+    journal=None,
+    known=None,
+    writer=None,
+):
+    """
+    Shape comment snapshot records into comment_data and analyze them
 
-        if analyze:
-            print(f"\n Analyzing sentiment for {total} comments...")
+    results may be a list or a record iterator such as iter_scrape_results().
+    Ingestion, normalization, analysis and writing run as concurrent
+    pipeline stages, so analysis starts on the first downloaded record and
+    every finished comment is handed to writer (an OutputWriter) in snapshot
+    order while later ones are still being analyzed.
 
-        for idx, comment in enumerate(results, 1):
-            comment_text = comment.get("comment_text", "")
+    With a CheckpointJournal, comments already in the journal are taken from
+    it instead of being analyzed again, and every newly analyzed comment is
+    appended to it as soon as it is done.
 
-            # Analyze sentiment if enabled and comment has text
-            if analyze and comment_text and post_content:
-                if idx % 10 == 0 or idx == total:
-                    print(f"   Analyzing... {idx}/{total}")
-                sentiment_data = analyze_sentiment(post_content, comment_text)
-            else:
-                sentiment_data = {
-                    "sentiment": "Neutral",
-                    "emotion": "Neutral",
-                    "confidence": 0.0,
-                }
-
-            comment_data = {
-                "user_name": comment.get("user_name", "Unknown"),
-                "user_url": comment.get("user_url", ""),
-                "date_created": comment.get("date_created", ""),
-                "comment_text": comment_text,
-                "likes_count": comment.get("likes_count", 0),
-                "replies_count": comment.get("replies_count", 0),
-                "sentiment": sentiment_data.get("sentiment", "Neutral"),
-                "emotion": sentiment_data.get("emotion", "Neutral"),
-                "confidence": sentiment_data.get("confidence", 0.0),
-            }
-            comments_list.append(comment_data)
+    known maps comment fingerprints to comment_data from a previous output
+    (see index_comments()); those comments keep their labels and only get
+    fresh likes and replies counts.
+    """
+    if results is None:
+        return []
+
+    analyze = analyze and bool(post_content)
+    known = known or {}
+    comments_list = []
+    # Workers finish out of order; the sink holds items back until every
+    # earlier one is done
+    waiting = {}
+    progress = {"analyzed": 0, "reused": 0}
+    index = DedupIndex(dedup_threshold) if analyze and dedup else None
+    journaled = journal.load() if journal and analyze else {}
+    # Indices whose labels come from the journal or the previous output;
+    # only the normalize worker adds to it, before the item moves on
+    labelled = set()
+
+    if journaled:
+        print(f"   Resuming: {len(journaled)} comments already analyzed")
+
+    def normalize(batch):
+        # Single worker, so comments reach the dedup index in snapshot order
+        items = []
+        for idx, record in batch:
+            comment_data = normalize_comment(record)
+            representative = idx
+            if index and comment_data["comment_text"]:
+                representative = index.assign(idx, comment_data["comment_text"])
+            previous = known.get(comment_fingerprint(comment_data))
+            if idx in journaled:
+                comment_data = journaled[idx]
+                labelled.add(idx)
+            elif previous and (previous.get("confidence") or not analyze):
+                # Failed analyses (confidence 0.0) are retried instead
+                comment_data["sentiment"] = previous.get("sentiment", "Neutral")
+                comment_data["emotion"] = previous.get("emotion", "Neutral")
+                comment_data["confidence"] = previous.get("confidence", 0.0)
+                comment_data["label_source"] = previous.get("label_source")
+                labelled.add(idx)
+            items.append((idx, comment_data, representative))
+        return items
+
+    def classify(batch):
+        # Only comments that have text, lead their duplicate group and are
+        # not labelled yet are sent for analysis
+        with_text = [
+            item
+            for item in batch
+            if item[1]["comment_text"]
+            and item[0] == item[2]
+            and item[0] not in labelled
+        ]
+        for group in pack_batches(
+            post_content,
+            [comment_data["comment_text"] for _, comment_data, _ in with_text],
+            range(len(with_text)),
+            batch_size,
+        ):
+            sentiments = analyze_group(
+                post_content,
+                [with_text[pos][1]["comment_text"] for pos in group],
+                batch_size,
+            )
+            for pos, sentiment_data in zip(group, sentiments):
+                comment_data = with_text[pos][1]
+                comment_data["sentiment"] = sentiment_data.get("sentiment", "Neutral")
+                comment_data["emotion"] = sentiment_data.get("emotion", "Neutral")
+                comment_data["confidence"] = sentiment_data.get("confidence", 0.0)
+                comment_data["label_source"] = sentiment_data.get("label_source")
+        return batch
+
+    def emit(idx, comment_data, representative):
+        if representative != idx and idx not in labelled:
+            # Duplicates take their representative's labels; it comes first
+            # in the snapshot, so it is already final
+            source = comments_list[representative]
+            comment_data["sentiment"] = source["sentiment"]
+            comment_data["emotion"] = source["emotion"]
+            comment_data["confidence"] = source["confidence"]
+            comment_data["label_source"] = "dedup" if source["label_source"] else None
+        comments_list.append(comment_data)
+        if writer:
+            writer.add(comment_data)
+
+    def collect(item):
+        waiting[item[0]] = item
+        while len(comments_list) in waiting:
+            emit(*waiting.pop(len(comments_list)))
+
+        idx, comment_data, representative = item
+        if idx in labelled and idx not in journaled:
+            progress["reused"] += 1
+        if (
+            analyze
+            and comment_data["comment_text"]
+            and idx == representative
+            and idx not in labelled
+        ):
+            # Failed analyses (confidence 0.0) stay out so a resume retries them
+            if journal and comment_data["confidence"]:
+                journal.append(idx, comment_data)
+            progress["analyzed"] += 1
+            if progress["analyzed"] % 10 == 0:
+                print(f"   Analyzing... {progress['analyzed']}")
+
+    stages = [Stage("normalize", normalize, batch_size=64)]
+    if analyze:
+        print("\n Analyzing sentiment while comments download...")
+        stages.append(
+            Stage(
+                "analyze",
+                classify,
+                workers=concurrency,
+                batch_size=batch_size,
+                linger=0.5 if batch_size > 1 else 0.0,
+            )
+        )
 
-        if analyze:
-            print("   ✓ Sentiment analysis complete!")
+    pipeline = Pipeline(stages)
+    try:
+        pipeline.run(enumerate(results), collect)
+    finally:
+        if journal:
+            journal.close()
+        # Stage busy time is summed over the stage's worker threads
+        for stage in stages:
+            metrics.add_time(
+                "parse" if stage.name == "normalize" else stage.name,
+                stage.busy,
+                stage.items,
+            )
 
-        return comments_list
+    if not comments_list:
+        return []
 
-    return []
+    if index:
+        count_stat("dedup_comments", index.total)
+        count_stat("dedup_groups", index.groups)
 
+    if known:
+        print(f"   Kept labels of {progress['reused']} previously analyzed comments")
 
-def save_to_json(data, filename):
-    """Save data to JSON file"""
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    print(f" Saved to: {filename}")
+    if analyze:
+        print(f"   Analyzed {progress['analyzed']} comments")
+        if index:
+            print(
+                f"   Deduplicated {index.total} comments into {index.groups} "
+                f"groups ({index.ratio():.1%} duplicates)"
+            )
+        print("   ✓ Sentiment analysis complete!")
+        print(pipeline.report())
 
+    return comments_list
 
-def display_summary(post_data, comments_data):
-    """Display a summary of scraped data"""
-    print("\n" + "=" * 60)
-    print(" SCRAPING SUMMARY")
-    print("=" * 60)
 
-    if post_data:
-        print(f"\n POST:")
-        print(f"   Author: {post_data.get('author', 'N/A')}")
-        print(f"   Date: {post_data.get('date', 'N/A')}")
-        print(f"   Likes: {post_data.get('likes', 0)}")
-        print(f"   Shares: {post_data.get('shares', 0)}")
-        print(f"   Comments: {post_data.get('comments_count', 0)}")
-        print(f"   Sentiment: {post_data.get('sentiment', 'N/A')}")
-        print(f"   Content: {post_data.get('content', '')[:100]}...")
+def scrape_facebook_post(post_url):
+    """Scrape a Facebook post content"""
+    print("🔄 Scraping post...")
 
-    if comments_data:
-        print(f"\n COMMENTS: {len(comments_data)} scraped")
+    # Trigger the scrape
+    snapshot_id = trigger_brightdata_scrape(post_url, POST_DATASET_ID)
 
-        # Show first 5 comments
-        for i, comment in enumerate(comments_data[:5], 1):
-            print(f"\n   Comment {i}:")
-            print(f"   User: {comment.get('user_name', 'Unknown')}")
-            print(f"   Date: {comment.get('date_created', 'N/A')}")
-            print(f"   Likes: {comment.get('likes_count', 0)}")
-            print(f"   Sentiment: {comment.get('sentiment', 'N/A')}")
-            print(f"   Text: {comment.get('comment_text', '')[:80]}...")
+    if not snapshot_id:
+        return None
 
-        if len(comments_data) > 5:
-            print(f"\n   ... and {len(comments_data) - 5} more comments")
+    print(f"   Snapshot ID: {snapshot_id}")
 
-    print("\n" + "=" * 60)
+    # Wait for completion
+    if not wait_for_snapshots({"Post": snapshot_id})["Post"]:
+        return None
 
+    # Get results
+    return build_post_data(get_scrape_results(snapshot_id), post_url)
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Facebook Post & Comments Scraper with Sentiment Analysis",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  python facebook_cli.py "https://www.facebook.com/page/posts/123456789"
-  python facebook_cli.py "https://m.facebook.com/story.php?story_fbid=123&id=456" -n 50
-  python facebook_cli.py "https://www.facebook.com/page/posts/123" -n 200 -o my_data.json
-        """,
-    )
 
-    parser.add_argument("url", help="Facebook post URL to scrape")
+def start_snapshots(post_url, datasets, resume=False, record=True):
+    """
+    Trigger the BrightData snapshots of a run, or reuse the ones recorded
+    for post_url when resuming
 
-    parser.add_argument(
-        "-n",
-        "--num-comments",
-        type=int,
-        default=100,
-        help="Maximum number of comments to scrape (default: 100)",
-    )
+    A recorded snapshot that has failed or no longer exists (expired, or
+    unknown to the API key) is dropped with its checkpoint journal and
+    triggered again, instead of being polled forever.
 
-    parser.add_argument(
-        "-o",
-        "--output",
-        default=None,
-        help="Output JSON file name (default: facebook_data_TIMESTAMP.json)",
-    )
+    Args:
+        datasets: Dict mapping "post"/"comments" to (dataset_id, limit_records)
+        record: Remember the snapshots in runs.json for a later --resume
 
-    parser.add_argument(
-        "--post-only", action="store_true", help="Scrape only the post, skip comments"
+    Returns:
+        dict: "post"/"comments" -> snapshot ID, or None if a trigger failed
+    """
+    previous = (find_run(post_url) or {}) if resume else {}
+    snapshots = {}
+
+    for kind, (dataset_id, limit_records) in datasets.items():
+        if previous.get(kind):
+            if fetch_scrape_progress(previous[kind])[0] != "failed":
+                snapshots[kind] = previous[kind]
+                print(f"   Resuming {kind} snapshot: {snapshots[kind]}")
+                continue
+            print(
+                f"   Recorded {kind} snapshot {previous[kind]} is gone; re-triggering"
+            )
+            CheckpointJournal(previous[kind]).remove()
+        snapshot_id = trigger_brightdata_scrape(post_url, dataset_id, limit_records)
+        if not snapshot_id:
+            return None
+        snapshots[kind] = snapshot_id
+
+    if record:
+        record_run(post_url, {**previous, **snapshots})
+    return snapshots
+
+
+def scrape_facebook_comments(
+    post_url,
+    limit_records=100,
+    post_content="",
+    analyze=True,
+    concurrency=8,
+    batch_size=1,
+    resume=False,
+    known=None,
+    writer=None,
+    checkpoint=True,
+):
+    """
+    Scrape comments from a Facebook post
+
+    Without checkpoint, nothing is written to runs.json or a journal, for
+    callers that never resume (the job service).
+    """
+    print(f"🔄 Scraping comments (limit: {limit_records})...")
+
+    # Trigger the scrape
+    snapshots = start_snapshots(
+        post_url,
+        {"comments": (COMMENTS_DATASET_ID, limit_records)},
+        resume,
+        record=checkpoint,
     )
 
-    parser.add_argument(
-        "--comments-only", action="store_true", help="Scrape only comments, skip post"
+    if not snapshots:
+        return None
+
+    snapshot_id = snapshots["comments"]
+    print(f"   Snapshot ID: {snapshot_id}")
+
+    # Wait for completion
+    if not wait_for_snapshots({"Comments": snapshot_id})["Comments"]:
+        return None
+
+    # Get results
+    try:
+        return build_comments_data(
+            iter_scrape_results(snapshot_id),
+            post_content=post_content,
+            analyze=analyze,
+            concurrency=concurrency,
+            batch_size=batch_size,
+            journal=CheckpointJournal(snapshot_id) if checkpoint else None,
+            known=known,
+            writer=writer,
+        )
+    except SnapshotError as e:
+        print(f"Error getting results: {e}")
+        return None
+
+
+def scrape_facebook_post_and_comments(
+    post_url,
+    limit_records=100,
+    analyze=True,
+    concurrency=8,
+    batch_size=1,
+    resume=False,
+    known=None,
+    writer=None,
+    checkpoint=True,
+):
+    """
+    Scrape a post and its comments with both snapshots running at once
+
+    The two BrightData jobs are independent, so both are triggered up front
+    and polled together; only sentiment analysis waits for the post content.
+    With resume, the snapshots and analyzed comments of an interrupted run
+    on the same URL are reused. Comments are passed to writer as they are
+    finished, see build_comments_data(). checkpoint works as in
+    scrape_facebook_comments().
+
+    Returns:
+        tuple: (post_data, comments_data), either of which is None on failure
+    """
+    print(f"🔄 Scraping post and comments (limit: {limit_records})...")
+
+    snapshots = start_snapshots(
+        post_url,
+        {
+            "post": (POST_DATASET_ID, None),
+            "comments": (COMMENTS_DATASET_ID, limit_records),
+        },
+        resume,
+        record=checkpoint,
     )
+    if not snapshots:
+        return None, None
 
-    parser.add_argument(
-        "--no-sentiment",
-        action="store_true",
-        help="Skip sentiment analysis (faster)",
+    post_snapshot = snapshots["post"]
+    comments_snapshot = snapshots["comments"]
+    print(f"   Post snapshot ID: {post_snapshot}")
+    print(f"   Comments snapshot ID: {comments_snapshot}")
+
+    outcome = wait_for_snapshots(
+        {"Post": post_snapshot, "Comments": comments_snapshot}
     )
 
-    args = parser.parse_args()
+    post_data = None
+    if outcome["Post"]:
+        post_data = build_post_data(get_scrape_results(post_snapshot), post_url)
+    if not post_data:
+        return None, None
+
+    comments_data = None
+    if outcome["Comments"]:
+        try:
+            comments_data = build_comments_data(
+                iter_scrape_results(comments_snapshot),
+                post_content=post_data.get("content", ""),
+                analyze=analyze,
+                concurrency=concurrency,
+                batch_size=batch_size,
+                journal=CheckpointJournal(comments_snapshot) if checkpoint else None,
+                known=known,
+                writer=writer,
+            )
+        except SnapshotError as e:
+            print(f"Error getting results: {e}")
+
+    return post_data, comments_data
+
+
+def to_mobile_url(url):
+    """Convert a desktop Facebook URL to the mobile site, which scrapes better"""
+    return url.replace("www.facebook.com", "m.facebook.com")
+
+
+def load_url_list(path, default_limit):
+    """
+    Read a bulk URL list: one URL per line, or JSONL objects with "url" and
+    an optional per-URL "limit_records"
+
+    Returns:
+        list: {"url", "limit_records"} dicts with mobile URLs
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                url = item["url"]
+                limit = item.get("limit_records", default_limit)
+            else:
+                url = line
+                limit = default_limit
+            entries.append({"url": to_mobile_url(url), "limit_records": limit})
+    return entries
+
+
+def record_input_url(record):
+    """Find which input URL a snapshot record belongs to"""
+    source = record.get("input")
+    if isinstance(source, dict) and source.get("url"):
+        return source["url"]
+    return record.get("url") or record.get("post_url") or ""
+
+
+def split_records_by_url(records, urls):
+    """Group snapshot records under the input URL each one came from"""
+    grouped = {url: [] for url in urls}
+    for record in records or []:
+        url = to_mobile_url(record_input_url(record))
+        if url in grouped:
+            grouped[url].append(record)
+    return grouped
+
+
+def scrape_bulk(entries, chunk_size=20, analyze=True, concurrency=8, batch_size=1):
+    """
+    Scrape many posts and their comments with one trigger per chunk of URLs
+
+    Every chunk's post and comments snapshots are polled by one shared
+    poller, and each post is analyzed as soon as its chunk's data is in.
+
+    Args:
+        entries: List of {"url", "limit_records"} dicts
+        chunk_size: URLs submitted per BrightData snapshot
+
+    Returns:
+        list: (post_url, post_data, comments_data) per input URL, with None
+        for the parts that could not be scraped
+    """
+    chunks = [
+        entries[start : start + chunk_size]
+        for start in range(0, len(entries), chunk_size)
+    ]
+    print(f"🔄 Scraping {len(entries)} posts in {len(chunks)} chunk(s)...")
+
+    poller = SnapshotPoller(fetch_scrape_progress)
+    jobs = []
+
+    for number, chunk in enumerate(chunks, 1):
+        post_snapshot = trigger_brightdata_bulk(
+            [{"url": entry["url"]} for entry in chunk], POST_DATASET_ID
+        )
+        comments_snapshot = trigger_brightdata_bulk(chunk, COMMENTS_DATASET_ID)
+        print(f"   Chunk {number}: post {post_snapshot}, comments {comments_snapshot}")
+
+        job = {"chunk": chunk}
+        if post_snapshot:
+            job["post"] = (
+                post_snapshot,
+                poller.add(post_snapshot, label=f"Chunk {number} posts"),
+            )
+        if comments_snapshot:
+            job["comments"] = (
+                comments_snapshot,
+                poller.add(comments_snapshot, label=f"Chunk {number} comments"),
+            )
+        jobs.append(job)
+
+    poller.start()
+
+    results = []
+    for job in jobs:
+        urls = [entry["url"] for entry in job["chunk"]]
+        posts = {url: [] for url in urls}
+        comments = {url: None for url in urls}
+
+        with metrics.timer("poll_wait"):
+            post_ready = "post" in job and job["post"][1].result()
+            comments_ready = "comments" in job and job["comments"][1].result()
+
+        if post_ready:
+            posts = split_records_by_url(get_scrape_results(job["post"][0]), urls)
+        if comments_ready:
+            try:
+                comments = split_records_by_url(
+                    iter_scrape_results(job["comments"][0]), urls
+                )
+            except SnapshotError as e:
+                # Every post of the chunk is reported as failed
+                print(f"Error getting results: {e}")
+
+        for url in urls:
+            post_data = build_post_data(posts[url], url)
+            comments_data = None
+            if comments[url] is not None:
+                print(f"\n📄 {url}")
+                comments_data = build_comments_data(
+                    comments[url],
+                    post_content=post_data.get("content", "") if post_data else "",
+                    analyze=analyze,
+                    concurrency=concurrency,
+                    batch_size=batch_size,
+                )
+            results.append((url, post_data, comments_data))
+
+    return results
+
+
+def build_output(post_url, post_data, comments_data):
+    """Assemble the JSON document written for one post"""
+    comments_data = comments_data or []
+    return {
+        "scraped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "post_url": post_url,
+        "post": post_data,
+        "comments": comments_data,
+        "statistics": {
+            "total_comments_scraped": len(comments_data),
+            "post_likes": post_data.get("likes", 0) if post_data else 0,
+            "post_shares": post_data.get("shares", 0) if post_data else 0,
+        },
+    }
+
+
+def save_to_json(data, filename):
+    """Save data to JSON file"""
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    print(f" Saved to: {filename}")
+
+
+def save_results(data, filename, fmt="json", writer=None):
+    """
+    Save one post's output as json, or as jsonl/parquet comments plus metadata
+
+    With the OutputWriter the comments were streamed to, only the rest of
+    the output is added and the file moved into place.
+    """
+    if writer:
+        writer.close(data)
+    else:
+        save_output(data, filename, fmt)
+    print(f" Saved to: {filename}")
+    if fmt != "json":
+        print(f" Post metadata: {metadata_path(filename)}")
+
+
+def display_summary(post_data, comments_data):
+    """Display a summary of scraped data"""
+    print("\n" + "=" * 60)
+    print(" SCRAPING SUMMARY")
+    print("=" * 60)
+
+    if post_data:
+        print(f"\n POST:")
+        print(f"   Author: {post_data.get('author', 'N/A')}")
+        print(f"   Date: {post_data.get('date', 'N/A')}")
+        print(f"   Likes: {post_data.get('likes', 0)}")
+        print(f"   Shares: {post_data.get('shares', 0)}")
+        print(f"   Comments: {post_data.get('comments_count', 0)}")
+        print(f"   Sentiment: {post_data.get('sentiment', 'N/A')}")
+        print(f"   Content: {post_data.get('content', '')[:100]}...")
+
+    if comments_data:
+        print(f"\n COMMENTS: {len(comments_data)} scraped")
+
+        # Show first 5 comments
+        for i, comment in enumerate(comments_data[:5], 1):
+            print(f"\n   Comment {i}:")
+            print(f"   User: {comment.get('user_name', 'Unknown')}")
+            print(f"   Date: {comment.get('date_created', 'N/A')}")
+            print(f"   Likes: {comment.get('likes_count', 0)}")
+            print(f"   Sentiment: {comment.get('sentiment', 'N/A')}")
+            print(f"   Text: {comment.get('comment_text', '')[:80]}...")
+
+        if len(comments_data) > 5:
+            print(f"\n   ... and {len(comments_data) - 5} more comments")
+
+    if cache:
+        cache_stats = cache.stats()
+        print(f"\n CACHE:")
+        print(f"   Hits: {cache_stats['hits']}")
+        print(f"   Misses: {cache_stats['misses']}")
+        print(f"   Hit rate: {cache_stats['hit_rate']:.1%}")
+
+    if run_stats["llm_calls"]:
+        print(f"\n TOKENS:")
+        print(f"   LLM calls: {run_stats['llm_calls']}")
+        print(f"   Prompt tokens: {run_stats['prompt_tokens']}")
+        print(f"   Cached prompt tokens: {run_stats['cached_tokens']}")
+        print(f"   Completion tokens: {run_stats['completion_tokens']}")
+        print(f"   Estimated cost: ${estimate_cost():.4f}")
+
+    failures = run_stats["invalid_replies"] + run_stats["invalid_items"]
+    if failures or run_stats["failed_comments"] or run_stats["api_errors"]:
+        print(f"\n ANALYSIS FAILURES:")
+        print(f"   Invalid replies: {run_stats['invalid_replies']}")
+        print(f"   Invalid batch items: {run_stats['invalid_items']}")
+        print(f"   Retries after invalid reply: {run_stats['parse_retries']}")
+        print(f"   API errors: {run_stats['api_errors']}")
+        print(f"   Comments left unanalyzed (Neutral, 0.0): {run_stats['failed_comments']}")
+
+    if scheduler.rate_limited or scheduler.retries:
+        print(f"\n RATE LIMITS:")
+        print(f"   429 responses: {scheduler.rate_limited}")
+        print(f"   Retried requests: {scheduler.retries}")
+        print(f"   Final concurrency limit: {int(scheduler.limit)}")
+
+    if run_stats["dedup_comments"]:
+        unique = run_stats["dedup_groups"]
+        total = run_stats["dedup_comments"]
+        print(f"\n DEDUPLICATION:")
+        print(f"   Comments with text: {total}")
+        print(f"   Unique after grouping: {unique}")
+        print(f"   Dedup ratio: {1 - unique / total:.1%}")
+
+    if local_model:
+        print(f"\n LOCAL MODEL:")
+        print(f"   Labeled without LLM: {run_stats['local_hits']}")
+
+    report = metrics.report()
+    if report["stages"]:
+        print(f"\n TIMINGS:")
+        for stage, timer in report["stages"].items():
+            print(f"   {stage}: {timer['seconds']:.2f}s (x{timer['count']})")
+        latency = report["histograms"].get("llm_latency_seconds")
+        if latency:
+            print(
+                f"   LLM latency p50/p95/p99: {latency['p50']:.2f}s / "
+                f"{latency['p95']:.2f}s / {latency['p99']:.2f}s"
+            )
+
+    print("\n" + "=" * 60)
+
+
+def run_bulk(args):
+    """--urls-file mode: scrape every listed post and save the outputs"""
+    entries = load_url_list(args.urls_file, args.num_comments)
+
+    print("\n" + "=" * 60)
+    print(" FACEBOOK SCRAPER (BULK)")
+    print("=" * 60)
+    print(f"URLs: {len(entries)} from {args.urls_file}")
+    print(f"Chunk Size: {args.chunk_size}")
+    print("=" * 60 + "\n")
+
+    try:
+        results = scrape_bulk(
+            entries,
+            chunk_size=args.chunk_size,
+            analyze=not args.no_sentiment,
+            concurrency=args.concurrency,
+            batch_size=args.batch_size,
+        )
+
+        outputs = []
+        failed = 0
+        for post_url, post_data, comments_data in results:
+            if not post_data or comments_data is None:
+                print(f" Failed to scrape {post_url}")
+                failed += 1
+            outputs.append(build_output(post_url, post_data, comments_data))
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if args.output:
+            # One combined file for the whole list
+            with metrics.timer("save"):
+                save_to_json(
+                    {
+                        "scraped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "posts": outputs,
+                    },
+                    args.output,
+                )
+        else:
+            os.makedirs(args.output_dir, exist_ok=True)
+            for number, output_data in enumerate(outputs, 1):
+                post = output_data["post"] or {}
+                post_id = (post.get("raw_data") or {}).get("post_id") or number
+                with metrics.timer("save"):
+                    save_results(
+                        output_data,
+                        os.path.join(
+                            args.output_dir,
+                            f"facebook_data_{post_id}_{timestamp}"
+                            + output_extension(args.format),
+                        ),
+                        args.format,
+                    )
+
+        print(f"\nBulk scraping completed: {len(outputs) - failed}/{len(outputs)} posts")
+
+    except KeyboardInterrupt:
+        print("\n\nScraping interrupted by user")
+
+
+def post_slug(post_url):
+    """File-name-safe stem for a watched post's output files"""
+    readable = re.sub(r"[^A-Za-z0-9]+", "_", post_url.split("://", 1)[-1]).strip("_")
+    digest = hashlib.sha1(post_url.encode("utf-8")).hexdigest()[:8]
+    return f"{readable[:60]}_{digest}"
+
+
+def sentiment_snapshot(post_url, post_data, comments_data, new_comments):
+    """One timestamped line of a post's watch history"""
+    analyzed = [comment for comment in comments_data if comment.get("confidence")]
+    return {
+        "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "post_url": post_url,
+        "comments": len(comments_data),
+        "new_comments": new_comments,
+        "likes": post_data.get("likes", 0),
+        "shares": post_data.get("shares", 0),
+        "sentiment": dict(Counter(comment["sentiment"] for comment in analyzed)),
+        "emotion": dict(Counter(comment["emotion"] for comment in analyzed)),
+        "average_confidence": (
+            sum(comment["confidence"] for comment in analyzed) / len(analyzed)
+            if analyzed
+            else 0.0
+        ),
+    }
+
+
+def refresh_post(post_url, limit_records, args, outputs):
+    """
+    One watch-mode refresh: scrape, analyze only new comments, save the
+    merged output and append a sentiment snapshot
+
+    Args:
+        outputs: Dict of post URL -> last saved output, kept in memory
+            between refreshes
+
+    Returns:
+        int: Comments not seen by the previous refresh, or None on failure
+    """
+    path = os.path.join(
+        args.output_dir, post_slug(post_url) + output_extension(args.format)
+    )
+    previous = outputs.get(post_url)
+    if previous is None and os.path.exists(path):
+        previous = load_output(path)
+    known = index_comments(previous["comments"]) if previous else {}
+
+    post_data, comments_data = scrape_facebook_post_and_comments(
+        post_url,
+        limit_records,
+        analyze=not args.no_sentiment,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        known=known,
+    )
+    if not post_data or comments_data is None:
+        print(f" Failed to refresh {post_url}")
+        return None
+
+    new_comments = sum(
+        1 for comment in comments_data if comment_fingerprint(comment) not in known
+    )
+    if previous:
+        comments_data = merge_comments(comments_data, previous["comments"])
+
+    output_data = build_output(post_url, post_data, comments_data)
+    with metrics.timer("save"):
+        save_results(output_data, path, args.format)
+        snapshot = sentiment_snapshot(post_url, post_data, comments_data, new_comments)
+        history = os.path.join(
+            args.output_dir, post_slug(post_url) + ".snapshots.jsonl"
+        )
+        with open(history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+    finish_run(post_url)
+    outputs[post_url] = output_data
+
+    print(f" {post_url}: {new_comments} new, {len(comments_data)} total")
+    return new_comments
+
+
+def run_watch(args):
+    """--watch mode: keep refreshing every post in one long-lived process"""
+    if args.urls_file:
+        entries = load_url_list(args.urls_file, args.num_comments)
+    else:
+        entries = [{"url": to_mobile_url(args.url), "limit_records": args.num_comments}]
+    limits = {entry["url"]: entry["limit_records"] for entry in entries}
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    print("\n" + "=" * 60)
+    print(" FACEBOOK SCRAPER (WATCH)")
+    print("=" * 60)
+    print(f"Posts: {len(entries)}")
+    print(f"Interval: {args.min_interval:g}-{args.max_interval:g} min")
+    print(f"Output Dir: {args.output_dir}")
+    print("=" * 60 + "\n")
+
+    # The BrightData session, OpenAI client, scheduler, sentiment cache and
+    # the last output of every post all stay warm between refreshes
+    outputs = {}
+    watcher = PostWatcher(
+        lambda post_url: refresh_post(post_url, limits[post_url], args, outputs),
+        min_interval=args.min_interval * 60,
+        max_interval=args.max_interval * 60,
+        target_new=args.target_new,
+        max_parallel=args.watch_parallel,
+    )
+    for entry in entries:
+        watcher.add(entry["url"])
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\n\nWatch stopped by user; waiting for running refreshes...")
+        watcher.stop()
+
+
+def metric_counters():
+    """run_stats plus the scheduler and cache counters, for metric exports"""
+    counters = dict(run_stats)
+    counters["llm_429"] = scheduler.rate_limited
+    counters["llm_retries"] = scheduler.retries
+    if cache:
+        cache_stats = cache.stats()
+        counters["cache_hits"] = cache_stats["hits"]
+        counters["cache_misses"] = cache_stats["misses"]
+    return counters
+
+
+def save_metrics(args):
+    """Write the --metrics JSON and --prometheus reports, if requested"""
+    if args.metrics:
+        metrics.save_json(args.metrics, metric_counters())
+        print(f" Metrics saved to: {args.metrics}")
+    if args.prometheus:
+        metrics.save_prometheus(args.prometheus, metric_counters())
+        print(f" Prometheus metrics saved to: {args.prometheus}")
 
+
+class ThreadProfiler:
+    """
+    cProfile for the main thread and every thread started while enabled
+
+    A cProfile.Profile only sees the thread that enabled it, so --profile would
+    miss the scrape workers, pipeline stages and LLM batch pool where most of
+    a run happens. threading.setprofile() hands each new thread a profiler of
+    its own, and stats() merges them all into one pstats.Stats.
+
+    On Python 3.12+ cProfile runs on sys.monitoring, which only allows one
+    active profiler but delivers the events of every thread to it, so a
+    single profiler is used and no hook is installed.
+    """
+
+    def __init__(self):
+        self.profilers = []
+        self.lock = threading.Lock()
+
+    def start_thread(self, frame, event, arg):
+        # Called on the first profile event of a new thread; enabling the
+        # profiler replaces this hook for that thread
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler already owns this thread; drop the hook so it
+            # does not run (and fail again) on every call
+            sys.setprofile(None)
+            return
+        with self.lock:
+            self.profilers.append(profiler)
+
+    def enable(self):
+        if sys.version_info < (3, 12):
+            threading.setprofile(self.start_thread)
+        self.start_thread(None, "call", None)
+
+    def disable(self):
+        if sys.version_info < (3, 12):
+            threading.setprofile(None)
+        with self.lock:
+            for profiler in self.profilers:
+                profiler.disable()
+
+    def stats(self):
+        """Merged stats of every profiled thread"""
+        with self.lock:
+            return pstats.Stats(*self.profilers)
+
+
+def save_profile(profiler, path):
+    """Dump --profile stats and print the top functions by cumulative time"""
+    stats = profiler.stats()
+    stats.dump_stats(path)
+    print(f"\n Profile saved to: {path} (open with python -m pstats {path})")
+    stats.sort_stats("cumulative").print_stats(25)
+
+
+def run_single(args, previous=None):
+    """Scrape, analyze and save one post; previous is the --update output"""
     # Convert to mobile URL if needed
     post_url = args.url
     if "www.facebook.com" in post_url:
-        post_url = post_url.replace("www.facebook.com", "m.facebook.com")
+        post_url = to_mobile_url(post_url)
         print(f"🔄 Converted to mobile URL: {post_url}")
 
     print("\n" + "=" * 60)
@@ -356,65 +1627,385 @@ Examples:
     print("=" * 60)
     print(f"URL: {post_url}")
     print(f"Max Comments: {args.num_comments}")
+    if previous:
+        print(f"Updating: {args.update} ({len(previous['comments'])} comments)")
     print("=" * 60 + "\n")
 
     post_data = None
     comments_data = []
+    known = index_comments(previous["comments"]) if previous else None
+
+    if args.output:
+        output_file = args.output
+    else:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = f"facebook_data_{timestamp}{output_extension(args.format)}"
+    writer = None
 
     try:
+        # Comments are written out while the rest are still being analyzed
+        if not args.post_only:
+            writer = OutputWriter(output_file, args.format)
+        analyze = not args.no_sentiment
+
+        if not args.comments_only and not args.post_only:
+            # Scrape post and comments in parallel
+            post_data, comments_data = scrape_facebook_post_and_comments(
+                post_url,
+                args.num_comments,
+                analyze=analyze,
+                concurrency=args.concurrency,
+                batch_size=args.batch_size,
+                resume=args.resume,
+                known=known,
+                writer=writer,
+            )
+            if not post_data:
+                print(" Failed to scrape post")
+                return
+            if comments_data is None:
+                print(" Failed to scrape comments")
+                return
+
         # Scrape post
-        if not args.comments_only:
+        elif not args.comments_only:
             post_data = scrape_facebook_post(post_url)
             if not post_data:
                 print(" Failed to scrape post")
                 return
 
         # Scrape comments
-        if not args.post_only:
-            post_content = post_data.get("content", "") if post_data else ""
-            analyze = not args.no_sentiment
+        elif not args.post_only:
             comments_data = scrape_facebook_comments(
-                post_url, args.num_comments, post_content=post_content, analyze=analyze
+                post_url,
+                args.num_comments,
+                # An update knows the post, so new comments can be analyzed
+                post_content=((previous or {}).get("post") or {}).get("content", ""),
+                analyze=analyze,
+                concurrency=args.concurrency,
+                batch_size=args.batch_size,
+                resume=args.resume,
+                known=known,
+                writer=writer,
             )
             if comments_data is None:
                 print(" Failed to scrape comments")
                 return
 
+        if previous:
+            # Whatever this run skipped comes from the previous output
+            post_data = post_data or previous.get("post")
+            fresh = len(comments_data)
+            comments_data = merge_comments(comments_data, previous["comments"])
+            if writer:
+                for comment in comments_data[fresh:]:
+                    writer.add(comment)
+
         # Display summary
         display_summary(post_data, comments_data)
 
         # Prepare output data
-        output_data = {
-            "scraped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "post_url": post_url,
-            "post": post_data,
-            "comments": comments_data,
-            "statistics": {
-                "total_comments_scraped": len(comments_data),
-                "post_likes": post_data.get("likes", 0) if post_data else 0,
-                "post_shares": post_data.get("shares", 0) if post_data else 0,
-            },
-        }
+        output_data = build_output(post_url, post_data, comments_data)
 
         # Save to file
-        if args.output:
-            output_file = args.output
-        else:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = f"facebook_data_{timestamp}.json"
-
-        save_to_json(output_data, output_file)
+        with metrics.timer("save"):
+            save_results(output_data, output_file, args.format, writer)
+        writer = None
+        finish_run(post_url)
 
         print(f"\nScraping completed successfully!")
         print(f" Data saved to: {output_file}")
 
     except KeyboardInterrupt:
         print("\n\nScraping interrupted by user")
+        print(" Progress is checkpointed; re-run with --resume to continue")
     except Exception as e:
         print(f"\nError: {e}")
         import traceback
 
         traceback.print_exc()
+    finally:
+        if writer:
+            writer.abort()
+
+
+def configure(args):
+    """
+    Set up the shared analysis state from parsed options
+
+    Reads concurrency, rpm, tpm, no_dedup, near_duplicates, no_cache,
+    no_sentiment, local_threshold and local_model from args.
+    """
+    global cache, local_model, local_threshold, dedup, dedup_threshold, scheduler
+    scheduler = LLMScheduler(
+        max_concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+    )
+    dedup = not args.no_dedup
+    dedup_threshold = args.near_duplicates
+
+    if not args.no_cache and not args.no_sentiment:
+        cache = SentimentCache()
+
+    if args.local_threshold is not None and not args.no_sentiment:
+        if os.path.exists(args.local_model):
+            local_model = LocalSentimentModel.load(args.local_model)
+            local_threshold = args.local_threshold
+        else:
+            print(f"⚠ Local model not found: {args.local_model}, using the LLM only")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Facebook Post & Comments Scraper with Sentiment Analysis",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python facebook_cli.py "https://www.facebook.com/page/posts/123456789"
+  python facebook_cli.py "https://m.facebook.com/story.php?story_fbid=123&id=456" -n 50
+  python facebook_cli.py "https://www.facebook.com/page/posts/123" -n 200 -o my_data.json
+  python facebook_cli.py --urls-file posts.txt --output-dir ./data
+  python facebook_cli.py --update data/my_post.json
+        """,
+    )
+
+    parser.add_argument("url", nargs="?", help="Facebook post URL to scrape")
+
+    parser.add_argument(
+        "--urls-file",
+        default=None,
+        help="Scrape every URL in this file (plain lines or JSONL with limit_records)",
+    )
+
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=20,
+        help="URLs submitted per BrightData snapshot in --urls-file mode (default: 20)",
+    )
+
+    parser.add_argument(
+        "--output-dir",
+        default=".",
+        help="Directory for per-post files in --urls-file mode (default: .)",
+    )
+
+    parser.add_argument(
+        "-n",
+        "--num-comments",
+        type=int,
+        default=100,
+        help="Maximum number of comments to scrape (default: 100)",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Output file name (default: facebook_data_TIMESTAMP.<format>)",
+    )
+
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=FORMATS,
+        default=None,
+        help="Output format; jsonl/parquet also write a <name>.post.json (default: json)",
+    )
+
+    parser.add_argument(
+        "--post-only", action="store_true", help="Scrape only the post, skip comments"
+    )
+
+    parser.add_argument(
+        "--comments-only", action="store_true", help="Scrape only comments, skip post"
+    )
+
+    parser.add_argument(
+        "--no-sentiment",
+        action="store_true",
+        help="Skip sentiment analysis (faster)",
+    )
+
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Number of comments analyzed in parallel (default: 8)",
+    )
+
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Comments sent per LLM request, sharing one copy of the post (default: 1)",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the on-disk sentiment cache in .cache/",
+    )
+
+    parser.add_argument(
+        "--local-threshold",
+        type=float,
+        default=None,
+        help="Skip the LLM for comments the local model labels at this confidence or above",
+    )
+
+    parser.add_argument(
+        "--local-model",
+        default=DEFAULT_MODEL_PATH,
+        help=f"Local model file from local_classifier.py (default: {DEFAULT_MODEL_PATH})",
+    )
+
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Analyze every comment even if it duplicates another",
+    )
+
+    parser.add_argument(
+        "--near-duplicates",
+        type=float,
+        nargs="?",
+        const=0.8,
+        default=None,
+        metavar="SIMILARITY",
+        help="Also share labels between near-duplicate comments at this "
+        "similarity (default when given: 0.8)",
+    )
+
+    parser.add_argument(
+        "--rpm",
+        type=int,
+        default=None,
+        help="OpenRouter requests per minute to stay under (default: no limit)",
+    )
+
+    parser.add_argument(
+        "--tpm",
+        type=int,
+        default=None,
+        help="OpenRouter tokens per minute to stay under (default: no limit)",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run on this URL from its checkpoint",
+    )
+
+    parser.add_argument(
+        "--update",
+        default=None,
+        metavar="EXISTING",
+        help="Re-scrape the post of a previous output, analyze only new comments "
+        "and rewrite it merged (or write to -o)",
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and refresh the post(s) on an adaptive schedule",
+    )
+
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=5,
+        help="Shortest minutes between refreshes of a post in --watch mode (default: 5)",
+    )
+
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        default=360,
+        help="Longest minutes between refreshes of a post in --watch mode (default: 360)",
+    )
+
+    parser.add_argument(
+        "--target-new",
+        type=int,
+        default=50,
+        help="New comments to aim for per refresh in --watch mode (default: 50)",
+    )
+
+    parser.add_argument(
+        "--watch-parallel",
+        type=int,
+        default=4,
+        help="Posts refreshed at the same time in --watch mode (default: 4)",
+    )
+
+    parser.add_argument(
+        "--metrics",
+        default=None,
+        metavar="FILE",
+        help="Write stage timings, latency percentiles and counters as JSON",
+    )
+
+    parser.add_argument(
+        "--prometheus",
+        default=None,
+        metavar="FILE",
+        help="Write the same metrics in Prometheus text format",
+    )
+
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="facebook_cli.prof",
+        default=None,
+        metavar="FILE",
+        help="Run under cProfile and dump the stats (default: facebook_cli.prof)",
+    )
+
+    args = parser.parse_args()
+
+    if not args.url and not args.urls_file and not args.update:
+        parser.error("a post URL, --urls-file or --update is required")
+    if args.urls_file and args.update:
+        parser.error("--update works on a single post, not with --urls-file")
+    if args.watch and args.update:
+        parser.error("--watch keeps its own outputs in --output-dir, drop --update")
+
+    previous = None
+    if args.update:
+        try:
+            previous = load_output(args.update)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read {args.update}: {e}")
+        args.url = args.url or previous.get("post_url")
+        if not args.url:
+            parser.error(f"{args.update} has no post_url; pass the URL too")
+        if not args.output:
+            args.output = args.update
+            args.format = args.format or format_of(args.update)
+    args.format = args.format or "json"
+
+    configure(args)
+
+    profiler = ThreadProfiler() if args.profile else None
+    if profiler:
+        profiler.enable()
+
+    try:
+        if args.watch:
+            run_watch(args)
+        elif args.urls_file:
+            run_bulk(args)
+        else:
+            run_single(args, previous)
+    finally:
+        if profiler:
+            profiler.disable()
+            save_profile(profiler, args.profile)
+        save_metrics(args)
 
 
 if __name__ == "__main__":
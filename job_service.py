@@ -0,0 +1,464 @@
+"""
+Local HTTP job service around the facebook_cli.py scrape and analysis
+pipeline
+
+One warm process (pooled BrightData connections, one LLM client and
+scheduler, the sentiment cache) serves every tool that used to shell out to
+facebook_cli.py.
+
+Endpoints:
+    POST /jobs                 {"url", "limit_records", "post_only",
+                               "comments_only", "analyze", "batch_size"}
+                               -> 202 {"job_id", "status", "coalesced"}
+    GET  /jobs                 Every known job's status
+    GET  /jobs/<id>            One job's status
+    GET  /jobs/<id>/result     The output as JSONL: a "post" line, one
+                               "comment" line per comment, a "statistics"
+                               line. ?wait=1 blocks until the job is done.
+    POST /analyze              {"post", "comments": [...], "batch_size"}
+                               -> JSONL sentiment per comment
+    GET  /health
+
+Usage:
+    python job_service.py --port 8765 --workers 4 -c 8 -b 10
+"""
+
+import json
+import uuid
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import facebook_cli
+from local_classifier import DEFAULT_MODEL_PATH
+
+
+# Finished jobs kept for status/result requests before the oldest go
+MAX_FINISHED_JOBS = 500
+
+
+def job_key(params):
+    """Jobs with equal keys would produce the same output and are coalesced"""
+    return json.dumps(
+        [
+            params["url"],
+            params["limit_records"],
+            params["post_only"],
+            params["comments_only"],
+            params["analyze"],
+            params["batch_size"],
+        ]
+    )
+
+
+def parse_job_params(body, default_batch_size=1):
+    """
+    Validate a POST /jobs body
+
+    Raises:
+        ValueError: on a missing URL or conflicting options
+    """
+    if not isinstance(body, dict) or not body.get("url"):
+        raise ValueError('"url" is required')
+    params = {
+        "url": facebook_cli.to_mobile_url(str(body["url"])),
+        "limit_records": int(body.get("limit_records", 100)),
+        "post_only": bool(body.get("post_only", False)),
+        "comments_only": bool(body.get("comments_only", False)),
+        "analyze": bool(body.get("analyze", True)),
+        "batch_size": int(body.get("batch_size", default_batch_size)),
+    }
+    if params["post_only"] and params["comments_only"]:
+        raise ValueError("post_only and comments_only are exclusive")
+    return params
+
+
+def run_pipeline(params, concurrency):
+    """
+    Scrape and analyze one post like facebook_cli.py; returns its output
+
+    Jobs never resume, and two jobs on one URL with different options run
+    side by side, so nothing goes to runs.json or a checkpoint journal,
+    which are keyed by URL and snapshot for --resume.
+    """
+    post_url = params["url"]
+    post_data = None
+    comments_data = []
+
+    if params["post_only"]:
+        post_data = facebook_cli.scrape_facebook_post(post_url)
+        if not post_data:
+            raise RuntimeError("failed to scrape post")
+    elif params["comments_only"]:
+        comments_data = facebook_cli.scrape_facebook_comments(
+            post_url,
+            params["limit_records"],
+            analyze=params["analyze"],
+            concurrency=concurrency,
+            batch_size=params["batch_size"],
+            checkpoint=False,
+        )
+        if comments_data is None:
+            raise RuntimeError("failed to scrape comments")
+    else:
+        post_data, comments_data = facebook_cli.scrape_facebook_post_and_comments(
+            post_url,
+            params["limit_records"],
+            analyze=params["analyze"],
+            concurrency=concurrency,
+            batch_size=params["batch_size"],
+            checkpoint=False,
+        )
+        if not post_data:
+            raise RuntimeError("failed to scrape post")
+        if comments_data is None:
+            raise RuntimeError("failed to scrape comments")
+
+    return facebook_cli.build_output(post_url, post_data, comments_data)
+
+
+class JobQueue:
+    """
+    Scrape jobs run on a fixed worker pool, with request coalescing
+
+    A submit matching a queued or running job (same URL and options) joins
+    that job instead of starting another, so concurrent clients asking for
+    the same post share one scrape and one analysis.
+
+    Args:
+        workers: Jobs run at the same time
+        concurrency: Comments analyzed in parallel within each job
+        run: Callable taking (params, concurrency) and returning the output
+    """
+
+    def __init__(self, workers=2, concurrency=8, run=run_pipeline):
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self.concurrency = concurrency
+        self.run = run
+        self.jobs = {}
+        self.in_flight = {}
+        self.condition = threading.Condition()
+
+    def submit(self, params):
+        """
+        Returns:
+            tuple: (job status dict, True if it joined an existing job)
+        """
+        key = job_key(params)
+        with self.condition:
+            job_id = self.in_flight.get(key)
+            if job_id:
+                self.jobs[job_id]["clients"] += 1
+                return self.status(job_id), True
+
+            job_id = uuid.uuid4().hex[:12]
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "key": key,
+                "params": params,
+                "status": "queued",
+                "clients": 1,
+                "created_at": now(),
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+                "output": None,
+            }
+            self.in_flight[key] = job_id
+            self.prune()
+
+        self.pool.submit(self.execute, job_id)
+        return self.status(job_id), False
+
+    def execute(self, job_id):
+        with self.condition:
+            job = self.jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = now()
+
+        output, error = None, None
+        try:
+            output = self.run(job["params"], self.concurrency)
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+
+        with self.condition:
+            job["output"] = output
+            job["error"] = error
+            job["status"] = "failed" if error else "done"
+            job["finished_at"] = now()
+            self.in_flight.pop(job["key"], None)
+            self.condition.notify_all()
+
+    def prune(self):
+        # Caller holds self.condition
+        finished = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job["status"] in ("done", "failed")
+        ]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def status(self, job_id):
+        """Job fields without the output, or None for an unknown job"""
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            status = {
+                name: value
+                for name, value in job.items()
+                if name not in ("key", "output")
+            }
+            output = job["output"]
+            if output is not None:
+                status["comments"] = len(output.get("comments") or [])
+            return status
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job has finished; returns its status"""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.jobs.get(job_id) is None
+                or self.jobs[job_id]["status"] in ("done", "failed"),
+                timeout=timeout,
+            )
+        return self.status(job_id)
+
+    def output(self, job_id):
+        with self.condition:
+            job = self.jobs.get(job_id)
+            return job["output"] if job else None
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def output_lines(output_data):
+    """The JSONL lines of a job result"""
+    yield {
+        "type": "post",
+        "scraped_at": output_data["scraped_at"],
+        "post_url": output_data["post_url"],
+        "post": output_data["post"],
+    }
+    for comment in output_data["comments"] or []:
+        yield {"type": "comment", **comment}
+    yield {"type": "statistics", **output_data["statistics"]}
+
+
+class JobService:
+    """
+    HTTP front end of a JobQueue
+
+    Args:
+        queue: JobQueue the jobs run on
+        batch_size: Default comments per LLM request for jobs and /analyze
+    """
+
+    def __init__(self, queue, batch_size=1):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.server = None
+
+    def serve(self, host="127.0.0.1", port=8765):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                service.handle(self, "GET")
+
+            def do_POST(self):
+                service.handle(self, "POST")
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        print(f"Job service listening on http://{host}:{self.server.server_port}")
+        self.server.serve_forever()
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+
+    @staticmethod
+    def send_json(request, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    @staticmethod
+    def send_jsonl(request, lines):
+        # No Content-Length: the stream ends when the connection closes, so
+        # large results are written line by line instead of built up first
+        request.close_connection = True
+        request.send_response(200)
+        request.send_header("Content-Type", "application/x-ndjson")
+        request.send_header("Connection", "close")
+        request.end_headers()
+        for line in lines:
+            request.wfile.write((json.dumps(line, ensure_ascii=False) + "\n").encode())
+
+    @staticmethod
+    def read_json(request):
+        length = int(request.headers.get("Content-Length") or 0)
+        return json.loads(request.rfile.read(length) or b"null")
+
+    def handle(self, request, method):
+        parsed = urlparse(request.path)
+        parts = parsed.path.strip("/").split("/")
+        query = parse_qs(parsed.query)
+
+        try:
+            if method == "GET" and parts == ["health"]:
+                return self.send_json(request, 200, {"status": "ok"})
+            if parts[0] == "jobs":
+                if method == "POST" and len(parts) == 1:
+                    return self.submit(request)
+                if method == "GET" and len(parts) == 1:
+                    return self.send_json(
+                        request,
+                        200,
+                        [self.queue.status(job_id) for job_id in list(self.queue.jobs)],
+                    )
+                if method == "GET" and len(parts) == 2:
+                    return self.job_status(request, parts[1])
+                if method == "GET" and len(parts) == 3 and parts[2] == "result":
+                    return self.job_result(request, parts[1], query)
+            if method == "POST" and parts == ["analyze"]:
+                return self.analyze(request)
+        except (ValueError, TypeError) as e:
+            return self.send_json(request, 400, {"error": str(e)})
+
+        self.send_json(request, 404, {"error": f"no route for {method} {parsed.path}"})
+
+    def submit(self, request):
+        params = parse_job_params(self.read_json(request), self.batch_size)
+        status, coalesced = self.queue.submit(params)
+        self.send_json(request, 202, {**status, "coalesced": coalesced})
+
+    def job_status(self, request, job_id):
+        status = self.queue.status(job_id)
+        if status is None:
+            return self.send_json(request, 404, {"error": "unknown job"})
+        self.send_json(request, 200, status)
+
+    def job_result(self, request, job_id, query):
+        if query.get("wait", ["0"])[0] not in ("0", "false", ""):
+            status = self.queue.wait(job_id)
+        else:
+            status = self.queue.status(job_id)
+
+        if status is None:
+            return self.send_json(request, 404, {"error": "unknown job"})
+        if status["status"] == "failed":
+            return self.send_json(request, 500, status)
+        if status["status"] != "done":
+            return self.send_json(request, 409, status)
+        self.send_jsonl(request, output_lines(self.queue.output(job_id)))
+
+    def analyze(self, request):
+        body = self.read_json(request)
+        if not isinstance(body, dict) or not isinstance(body.get("comments"), list):
+            raise ValueError('"comments" must be a list of strings')
+        texts = [str(text) for text in body["comments"]]
+        results = facebook_cli.analyze_comments(
+            str(body.get("post", "")),
+            texts,
+            concurrency=self.queue.concurrency,
+            batch_size=int(body.get("batch_size", self.batch_size)),
+        )
+        self.send_jsonl(
+            request,
+            (
+                {"index": index, "comment_text": text, **sentiment_data}
+                for index, (text, sentiment_data) in enumerate(zip(texts, results))
+            ),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local HTTP job service for Facebook scraping and sentiment analysis",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Endpoints:")[1],
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=8765, help="Port (default: 8765)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Jobs run at the same time (default: 2)",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Comments analyzed in parallel per job (default: 8)",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Default comments per LLM request (default: 1)",
+    )
+    parser.add_argument("--rpm", type=int, default=None, help="Requests per minute cap")
+    parser.add_argument("--tpm", type=int, default=None, help="Tokens per minute cap")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Ignore the on-disk sentiment cache"
+    )
+    parser.add_argument(
+        "--no-dedup", action="store_true", help="Analyze duplicate comments too"
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        type=float,
+        nargs="?",
+        const=0.8,
+        default=None,
+        metavar="SIMILARITY",
+        help="Also share labels between near-duplicates (default when given: 0.8)",
+    )
+    parser.add_argument(
+        "--local-threshold",
+        type=float,
+        default=None,
+        help="Skip the LLM for comments the local model labels at this confidence",
+    )
+    parser.add_argument(
+        "--local-model", default=DEFAULT_MODEL_PATH, help="Local model file"
+    )
+    args = parser.parse_args()
+    args.no_sentiment = False
+
+    # One scheduler for every job, so the rate limits hold service-wide
+    facebook_cli.configure(args)
+
+    queue = JobQueue(workers=args.workers, concurrency=args.concurrency)
+    service = JobService(queue, batch_size=args.batch_size)
+    try:
+        service.serve(args.host, args.port)
+    except KeyboardInterrupt:
+        print("\nJob service stopped")
+    finally:
+        queue.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import os
+import re
+import sys
+import gzip
+import json
+import math
+import glob
+import zlib
+import random
+import argparse
+import unicodedata
+from collections import Counter, defaultdict
+
+from output_formats import load_output
+
+
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+EMOTIONS = ("Joy", "Anger", "Sadness", "Fear", "Surprise", "Neutral")
+
+DEFAULT_MODEL_PATH = "models/local_sentiment.json.gz"
+
+# Hashed feature space; keeps the model file small whatever the vocabulary
+NUM_BUCKETS = 1 << 18
+NGRAM_RANGE = (1, 4)
+
+
+def normalize_text(text):
+    """Lowercase, NFKC-normalize and collapse whitespace"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def extract_features(text):
+    """
+    Hashed character n-grams of the normalized text
+
+    Character n-grams work the same for Bengali, English and emoji, and
+    need no tokenizer or stemmer.
+    """
+    padded = f" {normalize_text(text)} "
+    features = Counter()
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for start in range(len(padded) - n + 1):
+            gram = padded[start : start + n]
+            if gram.strip():
+                features[zlib.crc32(gram.encode("utf-8")) % NUM_BUCKETS] += 1
+    return features
+
+
+class NaiveBayes:
+    """Multinomial naive Bayes over hashed n-gram counts"""
+
+    def __init__(self, labels, alpha=0.5):
+        self.labels = list(labels)
+        self.alpha = alpha
+        self.doc_counts = Counter()
+        self.feature_counts = defaultdict(Counter)
+        self.totals = Counter()
+        self.vocabulary = set()
+
+    def fit(self, feature_sets, labels):
+        for features, label in zip(feature_sets, labels):
+            self.doc_counts[label] += 1
+            self.feature_counts[label].update(features)
+            self.totals[label] += sum(features.values())
+            self.vocabulary.update(features)
+        return self
+
+    def predict(self, features):
+        """
+        Returns:
+            tuple: (label, probability)
+
+        Only n-grams seen in training are scored, and the posterior is
+        scaled by the share of the text's n-grams that were seen, so text
+        unlike anything in the training data gets a low probability instead
+        of falling back on the majority label.
+        """
+        docs = sum(self.doc_counts.values())
+        known = {
+            bucket: count
+            for bucket, count in features.items()
+            if bucket in self.vocabulary
+        }
+        if not docs or not known:
+            return "Neutral", 0.0
+
+        scores = {}
+        for label in self.labels:
+            if not self.doc_counts[label]:
+                continue
+            counts = self.feature_counts[label]
+            denominator = self.totals[label] + self.alpha * len(self.vocabulary)
+            likelihood = sum(
+                count * math.log((counts.get(bucket, 0) + self.alpha) / denominator)
+                for bucket, count in known.items()
+            )
+            scores[label] = math.log(self.doc_counts[label] / docs) + likelihood
+
+        top = max(scores.values())
+        weights = {label: math.exp(score - top) for label, score in scores.items()}
+        label = max(weights, key=weights.get)
+        coverage = sum(known.values()) / sum(features.values())
+        return label, weights[label] / sum(weights.values()) * coverage
+
+    def to_dict(self):
+        return {
+            "labels": self.labels,
+            "alpha": self.alpha,
+            "doc_counts": dict(self.doc_counts),
+            "totals": dict(self.totals),
+            "feature_counts": {
+                label: {str(bucket): count for bucket, count in counts.items()}
+                for label, counts in self.feature_counts.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls(data["labels"], data["alpha"])
+        model.doc_counts = Counter(data["doc_counts"])
+        model.totals = Counter(data["totals"])
+        for label, counts in data["feature_counts"].items():
+            model.feature_counts[label] = Counter(
+                {int(bucket): count for bucket, count in counts.items()}
+            )
+            model.vocabulary.update(model.feature_counts[label])
+        return model
+
+
+class LocalSentimentModel:
+    """
+    CPU-only sentiment and emotion classifier used as a first tier before
+    the LLM, trained from labels in previous output JSONs
+    """
+
+    def __init__(self, sentiment=None, emotion=None):
+        self.sentiment = sentiment or NaiveBayes(SENTIMENTS)
+        self.emotion = emotion or NaiveBayes(EMOTIONS)
+
+    def fit(self, texts, sentiments, emotions):
+        feature_sets = [extract_features(text) for text in texts]
+        self.sentiment.fit(feature_sets, sentiments)
+        self.emotion.fit(feature_sets, emotions)
+        return self
+
+    def predict(self, text):
+        """
+        Returns:
+            dict: sentiment, emotion and confidence, where confidence is the
+            lower of the two label probabilities
+        """
+        features = extract_features(text)
+        sentiment, sentiment_p = self.sentiment.predict(features)
+        emotion, emotion_p = self.emotion.predict(features)
+        return {
+            "sentiment": sentiment,
+            "emotion": emotion,
+            "confidence": round(min(sentiment_p, emotion_p), 3),
+        }
+
+    def save(self, path):
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": 1,
+                    "sentiment": self.sentiment.to_dict(),
+                    "emotion": self.emotion.to_dict(),
+                },
+                f,
+                separators=(",", ":"),
+            )
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            NaiveBayes.from_dict(data["sentiment"]),
+            NaiveBayes.from_dict(data["emotion"]),
+        )
+
+
+def load_examples(paths, min_confidence=0.6, allow_unmarked=False):
+    """
+    Collect (text, sentiment, emotion) from scraper outputs in any format
+
+    Only LLM labels are used: labels from this model itself ("local") or
+    copied between duplicates ("dedup") would teach it its own mistakes.
+    Skips empty comments, labels outside the known sets and low-confidence
+    labels, which include the 0.0 fallbacks of failed LLM calls.
+
+    Args:
+        allow_unmarked: Also use comments without a label_source, from
+            outputs written before it was recorded
+    """
+    examples = []
+    for path in paths:
+        data = load_output(path)
+        for comment in data.get("comments", []):
+            text = comment.get("comment_text", "")
+            if not text.strip():
+                continue
+            if comment.get("sentiment") not in SENTIMENTS:
+                continue
+            if comment.get("emotion") not in EMOTIONS:
+                continue
+            if (comment.get("confidence") or 0.0) < min_confidence:
+                continue
+            source = comment.get("label_source", "unmarked")
+            if source != "llm" and not (allow_unmarked and source == "unmarked"):
+                continue
+            examples.append((text, comment["sentiment"], comment["emotion"]))
+    return examples
+
+
+def evaluate(model, examples, thresholds=(0.5, 0.7, 0.8, 0.9, 0.95)):
+    """Print coverage and sentiment accuracy at several confidence thresholds"""
+    predictions = [(model.predict(text), sentiment) for text, sentiment, _ in examples]
+    for threshold in thresholds:
+        kept = [(p, s) for p, s in predictions if p["confidence"] >= threshold]
+        correct = sum(1 for p, s in kept if p["sentiment"] == s)
+        coverage = len(kept) / len(predictions) if predictions else 0.0
+        accuracy = correct / len(kept) if kept else 0.0
+        print(
+            f"   threshold {threshold:.2f}: "
+            f"coverage {coverage:.1%}, accuracy {accuracy:.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train the local first-tier sentiment model from scraper outputs",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python local_classifier.py train "data/*.json"
+  python local_classifier.py train "data/*.json" -o models/local_sentiment.json.gz --holdout 0.2
+  python local_classifier.py predict "বিনম্র শ্রদ্ধা"
+        """,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train = subparsers.add_parser("train", help="Train and export a model file")
+    train.add_argument(
+        "inputs",
+        nargs="+",
+        help="Output files (.json/.jsonl/.parquet) or glob patterns",
+    )
+    train.add_argument(
+        "-o",
+        "--output",
+        default=DEFAULT_MODEL_PATH,
+        help=f"Model file to write (default: {DEFAULT_MODEL_PATH})",
+    )
+    train.add_argument(
+        "--min-confidence",
+        type=float,
+        default=0.6,
+        help="Ignore training labels below this LLM confidence (default: 0.6)",
+    )
+    train.add_argument(
+        "--holdout",
+        type=float,
+        default=0.0,
+        help="Fraction of examples held out to report accuracy (default: 0)",
+    )
+    train.add_argument(
+        "--allow-unmarked",
+        action="store_true",
+        help="Also train on comments without a label_source (older outputs)",
+    )
+
+    predict = subparsers.add_parser("predict", help="Classify comment texts")
+    predict.add_argument("texts", nargs="+", help="Comment texts")
+    predict.add_argument("-m", "--model", default=DEFAULT_MODEL_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == "predict":
+        model = LocalSentimentModel.load(args.model)
+        for text in args.texts:
+            print(json.dumps(model.predict(text), ensure_ascii=False))
+        return
+
+    paths = sorted({p for pattern in args.inputs for p in glob.glob(pattern)})
+    examples = load_examples(paths, args.min_confidence, args.allow_unmarked)
+    if not examples:
+        print("No labeled comments found")
+        sys.exit(1)
+
+    print(f"🔄 Training on {len(examples)} comments from {len(paths)} file(s)...")
+
+    random.Random(0).shuffle(examples)
+    split = int(len(examples) * (1 - args.holdout))
+    train_set, test_set = examples[:split], examples[split:]
+
+    model = LocalSentimentModel().fit(*zip(*train_set))
+
+    if test_set:
+        print(f"   Holdout evaluation on {len(test_set)} comments:")
+        evaluate(model, test_set)
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    model.save(args.output)
+    print(f" Saved model to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
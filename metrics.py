@@ -0,0 +1,181 @@
+import re
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-fraction * len(sorted_values) // 1)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def metric_name(name):
+    """Prometheus-safe form of a metric or label name"""
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+class Metrics:
+    """
+    Thread-safe stage timers and latency histograms for one run
+
+    Timers accumulate seconds and a count (calls, or items for pipeline
+    stages) per stage. Histograms keep an exact count, sum, min and max, and
+    a uniform reservoir sample of at most max_samples observations for the
+    percentiles, so memory stays flat in --watch mode and the job service.
+    Counters stay with the caller (facebook_cli's run_stats) and are merged
+    in at report time. report() gives a JSON-ready dict and prometheus() the
+    same data in Prometheus text exposition format.
+
+    Args:
+        max_samples: Observations kept per histogram for percentiles
+    """
+
+    def __init__(self, max_samples=10000):
+        self.lock = threading.Lock()
+        self.max_samples = max_samples
+        self.started = time.monotonic()
+        self.timers = {}
+        self.histograms = {}
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the body of a with block as one call of stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started)
+
+    def add_time(self, stage, seconds, count=1):
+        with self.lock:
+            timer = self.timers.setdefault(stage, {"count": 0, "seconds": 0.0})
+            timer["count"] += count
+            timer["seconds"] += seconds
+
+    def timed_iter(self, stage, iterable):
+        """
+        Yield from iterable, timing only the waits for its next item
+
+        Used around streamed downloads so the time spent receiving records
+        is measured apart from the time spent processing them.
+        """
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(stage, time.perf_counter() - started)
+                return
+            self.add_time(stage, time.perf_counter() - started, count=0)
+            yield item
+
+    def observe(self, name, value):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = {
+                    "count": 0,
+                    "sum": 0.0,
+                    "min": value,
+                    "max": value,
+                    "samples": [],
+                }
+            histogram["count"] += 1
+            histogram["sum"] += value
+            histogram["min"] = min(histogram["min"], value)
+            histogram["max"] = max(histogram["max"], value)
+
+            # Reservoir sampling: once full, the n-th observation replaces a
+            # random sample with probability max_samples / n
+            samples = histogram["samples"]
+            if len(samples) < self.max_samples:
+                samples.append(value)
+            else:
+                slot = random.randrange(histogram["count"])
+                if slot < self.max_samples:
+                    samples[slot] = value
+
+    def summarize(self, histogram):
+        values = sorted(histogram["samples"])
+        return {
+            "count": histogram["count"],
+            "sum": histogram["sum"],
+            "min": histogram["min"],
+            "max": histogram["max"],
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+        }
+
+    def report(self, counters=None):
+        """
+        Args:
+            counters: Dict of counter totals to include, e.g. run_stats
+
+        Returns:
+            dict: wall_seconds, stages, histograms and counters
+        """
+        with self.lock:
+            timers = {stage: dict(timer) for stage, timer in self.timers.items()}
+            histograms = {
+                name: dict(histogram, samples=list(histogram["samples"]))
+                for name, histogram in self.histograms.items()
+            }
+
+        return {
+            "wall_seconds": time.monotonic() - self.started,
+            "stages": timers,
+            "histograms": {
+                name: self.summarize(histogram)
+                for name, histogram in histograms.items()
+            },
+            "counters": dict(counters or {}),
+        }
+
+    def save_json(self, path, counters=None):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(counters), f, indent=2)
+
+    def prometheus(self, counters=None, prefix="facebook_cli"):
+        """Report in Prometheus text exposition format"""
+        report = self.report(counters)
+        lines = [
+            f"# TYPE {prefix}_wall_seconds gauge",
+            f"{prefix}_wall_seconds {report['wall_seconds']:.6f}",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        for stage, timer in report["stages"].items():
+            lines.append(
+                f'{prefix}_stage_seconds_total{{stage="{stage}"}} {timer["seconds"]:.6f}'
+            )
+        lines.append(f"# TYPE {prefix}_stage_count_total counter")
+        for stage, timer in report["stages"].items():
+            lines.append(
+                f'{prefix}_stage_count_total{{stage="{stage}"}} {timer["count"]}'
+            )
+
+        for name, summary in report["histograms"].items():
+            metric = f"{prefix}_{metric_name(name)}"
+            lines.append(f"# TYPE {metric} summary")
+            for quantile in ("p50", "p95", "p99"):
+                lines.append(
+                    f'{metric}{{quantile="0.{quantile[1:]}"}} {summary[quantile]:.6f}'
+                )
+            lines.append(f"{metric}_sum {summary['sum']:.6f}")
+            lines.append(f"{metric}_count {summary['count']}")
+
+        for name, value in sorted(report["counters"].items()):
+            metric = f"{prefix}_{metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def save_prometheus(self, path, counters=None):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus(counters))
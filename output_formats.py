@@ -0,0 +1,262 @@
+import os
+import json
+import shutil
+import textwrap
+
+
+FORMATS = ("json", "jsonl", "parquet")
+
+
+def metadata_path(path):
+    """Post metadata file that sits next to a .jsonl or .parquet output"""
+    return os.path.splitext(path)[0] + ".post.json"
+
+
+def output_extension(fmt):
+    return {"json": ".json", "jsonl": ".jsonl", "parquet": ".parquet"}[fmt]
+
+
+def format_of(path):
+    """Output format matching a file's extension, json if unknown"""
+    for fmt in FORMATS:
+        if path.endswith(output_extension(fmt)):
+            return fmt
+    return "json"
+
+
+def save_output(output_data, path, fmt="json"):
+    """
+    Write a run's output in the requested format
+
+    json writes the usual single document. jsonl and parquet write the
+    comments as one line or row each, plus a small <name>.post.json with
+    everything else (scraped_at, post_url, post, statistics).
+    """
+    if fmt == "json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        return
+
+    save_metadata(output_data, path)
+
+    if fmt == "jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for comment in output_data["comments"]:
+                f.write(json.dumps(comment, ensure_ascii=False) + "\n")
+    elif fmt == "parquet":
+        write_comments_parquet(output_data["comments"], path)
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
+
+
+def save_metadata(output_data, path):
+    """Write the <name>.post.json of a .jsonl or .parquet output"""
+    metadata = {key: value for key, value in output_data.items() if key != "comments"}
+    with open(metadata_path(path), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+
+class OutputWriter:
+    """
+    Write an output's comments while the run is still producing them
+
+    Comments go to <path>.part as they are added (parquet in row groups of
+    batch_size); close() adds the post and statistics and moves the file into
+    place, giving the same file as save_output(). A run that dies part-way
+    leaves only the .part file, never a truncated output.
+
+    Args:
+        path: Output file
+        fmt: One of FORMATS
+        batch_size: Comments per parquet row group
+    """
+
+    def __init__(self, path, fmt="json", batch_size=1000):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.part_path = path + ".part"
+        self.batch_size = batch_size
+        self.count = 0
+        self.rows = []
+        self.parquet = None
+        self.file = None
+        if fmt != "parquet":
+            self.file = open(self.part_path, "w", encoding="utf-8")
+
+    def add(self, comment):
+        if self.fmt == "json":
+            # Laid out the way json.dump(indent=2) lays out the comments list
+            text = json.dumps(comment, indent=2, ensure_ascii=False)
+            self.file.write(",\n" if self.count else "\n")
+            self.file.write(textwrap.indent(text, "    "))
+        elif self.fmt == "jsonl":
+            self.file.write(json.dumps(comment, ensure_ascii=False) + "\n")
+        else:
+            self.rows.append(comment)
+            if len(self.rows) >= self.batch_size:
+                self.flush()
+        self.count += 1
+
+    def flush(self):
+        """Write the buffered parquet rows as one row group"""
+        import pyarrow.parquet as pq
+
+        table = comments_table(self.rows)
+        if self.parquet is None:
+            self.parquet = pq.ParquetWriter(
+                self.part_path, table.schema, compression="zstd"
+            )
+        self.parquet.write_table(table)
+        self.rows = []
+
+    def close(self, output_data):
+        """
+        Finish the file with everything in output_data but its comments,
+        which are the ones passed to add()
+        """
+        if self.fmt == "json":
+            self.file.close()
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                self.write_json(f, output_data)
+            os.replace(temp_path, self.path)
+            os.remove(self.part_path)
+            return
+
+        if self.fmt == "jsonl":
+            self.file.close()
+        else:
+            if self.rows or self.parquet is None:
+                self.flush()
+            self.parquet.close()
+        save_metadata(output_data, self.path)
+        os.replace(self.part_path, self.path)
+
+    def write_json(self, f, output_data):
+        f.write("{")
+        for position, (key, value) in enumerate(output_data.items()):
+            f.write(",\n  " if position else "\n  ")
+            f.write(json.dumps(key) + ": ")
+            if key == "comments":
+                f.write("[")
+                with open(self.part_path, "r", encoding="utf-8") as part:
+                    shutil.copyfileobj(part, f)
+                f.write("\n  ]" if self.count else "]")
+            else:
+                text = json.dumps(value, indent=2, ensure_ascii=False)
+                f.write(textwrap.indent(text, "  ").lstrip())
+        f.write("\n}")
+
+    def abort(self):
+        """Drop the partial file of a run that failed"""
+        if self.file:
+            self.file.close()
+        if self.parquet:
+            self.parquet.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+
+def comments_table(comments):
+    """Typed Arrow table of comment_data dicts"""
+    import pandas as pd
+    import pyarrow as pa
+
+    def column(name, default):
+        return [comment.get(name, default) for comment in comments]
+
+    # Parsed leniently: a date that is not ISO 8601 ("2 hrs ago") is stored as
+    # null rather than failing the save after the LLM calls are paid for
+    dates = pd.Series(
+        pd.to_datetime(
+            [value or None for value in column("date_created", "")],
+            errors="coerce",
+            utc=True,
+            format="ISO8601",
+        )
+    )
+    dates = pa.Array.from_pandas(dates).cast(pa.timestamp("ms", tz="UTC"), safe=False)
+
+    return pa.table(
+        {
+            "user_name": pa.array(column("user_name", "Unknown"), pa.string()),
+            "user_url": pa.array(column("user_url", ""), pa.string()),
+            "date_created": dates,
+            "comment_text": pa.array(column("comment_text", ""), pa.string()),
+            "likes_count": pa.array(column("likes_count", 0), pa.int32()),
+            "replies_count": pa.array(column("replies_count", 0), pa.int32()),
+            "sentiment": pa.array(
+                column("sentiment", "Neutral"), pa.string()
+            ).dictionary_encode(),
+            "emotion": pa.array(
+                column("emotion", "Neutral"), pa.string()
+            ).dictionary_encode(),
+            "confidence": pa.array(column("confidence", 0.0), pa.float32()),
+            "label_source": pa.array(
+                column("label_source", None), pa.string()
+            ).dictionary_encode(),
+        }
+    )
+
+
+def write_comments_parquet(comments, path):
+    import pyarrow.parquet as pq
+
+    pq.write_table(comments_table(comments), path, compression="zstd")
+
+
+def read_comments_frame(path, columns=None):
+    """
+    Comments of a .parquet or .jsonl output as a pandas DataFrame
+
+    Parquet is memory-mapped and only the requested columns are read.
+    Requested columns the file does not have (older outputs) are left out.
+    """
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        if columns:
+            names = set(pq.read_schema(path).names)
+            columns = [column for column in columns if column in names]
+        table = pq.read_table(path, columns=columns, memory_map=True)
+        return table.to_pandas()
+
+    # dtype=False keeps all-numeric comment texts as strings
+    frame = pd.read_json(path, lines=True, dtype=False)
+    if columns:
+        return frame[[column for column in columns if column in frame.columns]]
+    return frame
+
+
+def load_output(path):
+    """
+    Load any output format back into the JSON document shape
+
+    For .parquet and .jsonl the comments are rebuilt from the table and the
+    rest comes from the <name>.post.json metadata file.
+    """
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    with open(metadata_path(path), "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    frame = read_comments_frame(path)
+    if hasattr(frame["date_created"], "dt"):
+        frame["date_created"] = (
+            frame["date_created"].dt.strftime("%Y-%m-%dT%H:%M:%S.000Z").fillna("")
+        )
+    frame["sentiment"] = frame["sentiment"].astype(str)
+    frame["emotion"] = frame["emotion"].astype(str)
+    # float32 storage; round away the widening noise (0.9 -> 0.8999999762)
+    frame["confidence"] = frame["confidence"].astype(float).round(4)
+    if "label_source" in frame:
+        source = frame["label_source"].astype(object)
+        frame["label_source"] = source.where(source.notna(), None)
+    data["comments"] = frame.to_dict("records")
+    return data
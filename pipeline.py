@@ -0,0 +1,198 @@
+import time
+import queue
+import threading
+
+
+# Marks the end of a stream between stages
+DONE = object()
+
+
+class Stage:
+    """
+    One step of a Pipeline
+
+    Args:
+        name: Label used in the throughput report
+        func: Called with a list of up to batch_size items, returns the list
+            of items to pass downstream
+        workers: Threads running func in parallel
+        batch_size: Maximum items handed to func per call
+        linger: Seconds to wait for a partial batch to fill up
+    """
+
+    def __init__(self, name, func, workers=1, batch_size=1, linger=0.0):
+        self.name = name
+        self.linger = linger
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.items = 0
+        self.busy = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, count, elapsed):
+        with self.lock:
+            self.items += count
+            self.busy += elapsed
+
+
+class Pipeline:
+    """
+    Run a source, a chain of stages and a sink concurrently
+
+    Stages are connected by bounded queues, so a slow stage applies
+    backpressure upstream instead of letting items pile up in memory. The
+    source runs in its own thread, each stage in its own worker threads and
+    the sink in the calling thread.
+    """
+
+    def __init__(self, stages, queue_size=256):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.source_items = 0
+        self.elapsed = 0.0
+        self.error = None
+
+    def fail(self, error):
+        if self.error is None:
+            self.error = error
+
+    def put(self, q, item):
+        # Give up if another thread failed, rather than block forever
+        while self.error is None:
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, q):
+        # Stop waiting once another thread failed: its DONE may never come,
+        # since put() refuses to enqueue after a failure
+        while self.error is None:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return DONE
+
+    def feed(self, source, out):
+        try:
+            for item in source:
+                self.source_items += 1
+                if not self.put(out, item):
+                    return
+        except BaseException as e:
+            self.fail(e)
+        finally:
+            self.put(out, DONE)
+
+    def work(self, stage, inbox, out, finished):
+        try:
+            while self.error is None:
+                item = self.get(inbox)
+                if item is DONE:
+                    # Let sibling workers see the end of the stream too
+                    inbox.put(DONE)
+                    break
+
+                batch = [item]
+                deadline = time.monotonic() + stage.linger
+                while len(batch) < stage.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining > 0:
+                            item = inbox.get(timeout=remaining)
+                        else:
+                            item = inbox.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is DONE:
+                        inbox.put(DONE)
+                        break
+                    batch.append(item)
+
+                started = time.perf_counter()
+                results = stage.func(batch)
+                stage.record(len(batch), time.perf_counter() - started)
+
+                for result in results:
+                    if not self.put(out, result):
+                        return
+        except BaseException as e:
+            self.fail(e)
+        finally:
+            with finished["lock"]:
+                finished["count"] += 1
+                last = finished["count"] == stage.workers
+            if last:
+                self.put(out, DONE)
+
+    def run(self, source, sink):
+        """
+        Push every item from source through the stages into sink
+
+        Raises the first exception raised by the source, a stage or the sink.
+        """
+        started = time.perf_counter()
+        queues = [
+            queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)
+        ]
+        threads = [
+            threading.Thread(target=self.feed, args=(source, queues[0]), daemon=True)
+        ]
+
+        for position, stage in enumerate(self.stages):
+            finished = {"count": 0, "lock": threading.Lock()}
+            for _ in range(stage.workers):
+                threads.append(
+                    threading.Thread(
+                        target=self.work,
+                        args=(stage, queues[position], queues[position + 1], finished),
+                        daemon=True,
+                    )
+                )
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                try:
+                    item = queues[-1].get(timeout=0.1)
+                except queue.Empty:
+                    if self.error is not None:
+                        break
+                    continue
+                if item is DONE:
+                    break
+                sink(item)
+        except BaseException as e:
+            self.fail(e)
+            raise
+        finally:
+            self.elapsed = time.perf_counter() - started
+
+        if self.error is not None:
+            # Stage workers notice the failure within one get() timeout; the
+            # source thread may be blocked inside its iterator and is left
+            # to finish on its own (it is a daemon and stops at its next put)
+            for thread in threads[1:]:
+                thread.join()
+            raise self.error
+
+        for thread in threads:
+            thread.join()
+
+    def report(self):
+        """Per-stage item counts and throughput for the last run"""
+        lines = [f"   ingest: {self.source_items} items"]
+        for stage in self.stages:
+            rate = stage.items / self.elapsed if self.elapsed else 0.0
+            busy = stage.busy / stage.workers / self.elapsed if self.elapsed else 0.0
+            lines.append(
+                f"   {stage.name}: {stage.items} items, {rate:.1f}/s, "
+                f"{busy:.0%} busy x{stage.workers}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,186 @@
+import time
+import random
+import threading
+
+
+class TokenBucket:
+    """
+    Refilling budget of requests or tokens per minute
+
+    acquire() blocks until the amount is available. Actual usage can be
+    settled afterwards with debit(), which may push the bucket below zero
+    so later callers wait off the overshoot.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.available = min(
+            self.capacity, self.available + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def acquire(self, amount):
+        # Never ask for more than a full bucket, or the wait would be endless
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self.refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) / self.rate
+            time.sleep(wait)
+
+    def debit(self, amount):
+        with self.lock:
+            self.refill()
+            self.available -= amount
+
+
+class RateLimitedError(Exception):
+    """Raised by a call wrapped in LLMScheduler.call() when the provider
+    answered 429; retry_after is in seconds, or None if not given"""
+
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    """
+    Gate in front of the LLM client that runs at the provider's real ceiling
+
+    Requests wait for request and token budgets (token buckets per minute),
+    then for a slot under an adaptive concurrency limit. The limit follows
+    AIMD: it grows by about one slot per limit's worth of successful calls,
+    halves on every 429 and shrinks gently when latency climbs well above
+    its baseline. Rate-limited and transient failures are retried, waiting
+    for Retry-After when the provider sends one.
+
+    Args:
+        max_concurrency: Upper bound on in-flight requests
+        requests_per_minute: Request budget, or None for no limit
+        tokens_per_minute: Token budget, or None for no limit
+        max_retries: Attempts after the first for retryable failures
+    """
+
+    def __init__(
+        self,
+        max_concurrency=8,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_retries=6,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.baseline_latency = None
+        self.paused_until = 0.0
+        self.rate_limited = 0
+        self.retries = 0
+
+    def acquire_slot(self):
+        with self.condition:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self.condition.wait(timeout=wait if wait > 0 else None)
+
+    def release_slot(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self, latency):
+        with self.condition:
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            else:
+                # Track the fast end of the latency distribution as baseline
+                self.baseline_latency = min(
+                    latency, self.baseline_latency * 0.95 + latency * 0.05
+                )
+
+            if latency > 3 * self.baseline_latency:
+                self.limit = max(1.0, self.limit * 0.9)
+            else:
+                self.limit = min(
+                    float(self.max_concurrency), self.limit + 1.0 / self.limit
+                )
+            self.condition.notify_all()
+
+    def on_rate_limited(self, retry_after):
+        with self.condition:
+            self.rate_limited += 1
+            self.limit = max(1.0, self.limit / 2)
+            if retry_after:
+                self.paused_until = max(
+                    self.paused_until, time.monotonic() + retry_after
+                )
+
+    def call(self, func, estimated_tokens=0, is_retryable=None):
+        """
+        Run func() under the rate limits, retrying when it is rate limited
+
+        Args:
+            func: Zero-argument callable performing one request. Returns
+                (result, tokens_used) and raises RateLimitedError on 429.
+            estimated_tokens: Tokens reserved before the call
+            is_retryable: Optional predicate for other exceptions worth
+                retrying with backoff, e.g. 5xx or connection errors
+
+        Returns:
+            The result of func()
+        """
+        for attempt in range(self.max_retries + 1):
+            if self.requests:
+                self.requests.acquire(1)
+            if self.tokens and estimated_tokens:
+                self.tokens.acquire(estimated_tokens)
+
+            self.acquire_slot()
+            started = time.monotonic()
+            try:
+                result, tokens_used = func()
+            except RateLimitedError as e:
+                self.release_slot()
+                self.on_rate_limited(e.retry_after)
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                if not e.retry_after:
+                    time.sleep(self.backoff(attempt))
+                continue
+            except Exception as e:
+                self.release_slot()
+                if attempt == self.max_retries or not (
+                    is_retryable and is_retryable(e)
+                ):
+                    raise
+                self.retries += 1
+                time.sleep(self.backoff(attempt))
+                continue
+
+            self.release_slot()
+            self.on_success(time.monotonic() - started)
+            if self.tokens and tokens_used > estimated_tokens:
+                self.tokens.debit(tokens_used - estimated_tokens)
+            return result
+
+    @staticmethod
+    def backoff(attempt):
+        """Exponential backoff with full jitter, capped at 30 seconds"""
+        return random.uniform(0, min(30.0, 0.5 * 2**attempt))
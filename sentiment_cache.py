@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "sentiment.sqlite3")
+
+
+class SentimentCache:
+    """
+    On-disk cache of parsed sentiment results, keyed by a hash of
+    (model, prompt version, post content, comment text)
+
+    Entries older than max_age_days are never returned, and are dropped
+    together with the least recently used entries over max_entries when the
+    cache opens and again every evict_every puts, so long-lived processes
+    (--watch, the job service) stay within the limits too.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        max_entries=200000,
+        max_age_days=30,
+        evict_every=1000,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 24 * 3600
+        self.evict_every = evict_every
+        self.puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Shared between the analysis worker threads, guarded by self.lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS sentiment (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS sentiment_accessed ON sentiment (accessed_at)"
+        )
+        self.conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(model, prompt_version, post_content, comment_text):
+        """Content address for one (model, prompt, post, comment) combination"""
+        digest = hashlib.sha256()
+        for part in (model, str(prompt_version), post_content, comment_text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached sentiment dict for key, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM sentiment WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.max_age),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute(
+                "UPDATE sentiment SET accessed_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        """Store a parsed sentiment dict under key"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self.conn.commit()
+            self.puts += 1
+            due = self.puts % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used over the size cap"""
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM sentiment WHERE created_at < ?",
+                (time.time() - self.max_age,),
+            )
+            self.conn.execute(
+                """DELETE FROM sentiment WHERE key IN (
+                    SELECT key FROM sentiment ORDER BY accessed_at DESC
+                    LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self.conn.commit()
+
+    def stats(self):
+        """Hit/miss counters for this run"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,166 @@
+import time
+import random
+import threading
+from concurrent.futures import Future
+
+
+class SnapshotPoller:
+    """
+    Poll many BrightData snapshots from a single loop
+
+    Each snapshot gets its own exponential backoff with jitter, so small
+    snapshots are picked up within a second or two while long-running ones
+    are polled less and less often. A Retry-After from the progress endpoint
+    pauses all polling, since BrightData rate limits per API key.
+
+    Args:
+        check_progress: Callable taking a snapshot ID and returning
+            (status, retry_after_seconds or None)
+        initial_delay: Seconds before the first re-poll of a snapshot
+        max_delay: Upper bound on the per-snapshot delay
+        factor: Backoff multiplier applied after every unfinished poll
+        jitter: Fraction of the delay randomly added or removed
+        max_errors: Polls in a row that may raise before the snapshot is
+            given up as failed
+    """
+
+    def __init__(
+        self,
+        check_progress,
+        initial_delay=1.0,
+        max_delay=30.0,
+        factor=1.6,
+        jitter=0.2,
+        max_errors=10,
+    ):
+        self.check_progress = check_progress
+        self.max_errors = max_errors
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.polls = 0
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.paused_until = 0.0
+
+    def add(self, snapshot_id, on_ready=None, on_failed=None, label=None):
+        """
+        Start tracking a snapshot
+
+        Returns:
+            Future: resolves to True when the snapshot is ready, False if it
+            failed. on_ready/on_failed are called with the snapshot ID.
+        """
+        future = Future()
+        with self.lock:
+            self.pending[snapshot_id] = {
+                "future": future,
+                "on_ready": on_ready,
+                "on_failed": on_failed,
+                "label": label or snapshot_id,
+                "delay": self.initial_delay,
+                "next_poll": time.monotonic(),
+                "status": None,
+                "errors": 0,
+            }
+        self.wakeup.set()
+        return future
+
+    def next_delay(self, delay):
+        spread = delay * self.jitter
+        return max(0.1, delay + random.uniform(-spread, spread))
+
+    def poll_once(self):
+        """
+        Poll every snapshot that is due
+
+        Returns:
+            float: Seconds until the next snapshot is due, or None if
+            nothing is left to track
+        """
+        now = time.monotonic()
+        with self.lock:
+            due = [
+                snapshot_id
+                for snapshot_id, entry in self.pending.items()
+                if entry["next_poll"] <= now
+            ]
+
+        if now >= self.paused_until:
+            for snapshot_id in due:
+                with self.lock:
+                    entry = self.pending[snapshot_id]
+
+                try:
+                    status, retry_after = self.check_progress(snapshot_id)
+                    entry["errors"] = 0
+                except Exception as e:
+                    # Treated like an unknown status and retried with backoff,
+                    # unless it keeps happening
+                    print(f"   {entry['label']} progress check error: {e}")
+                    entry["errors"] += 1
+                    status, retry_after = None, None
+                    if entry["errors"] >= self.max_errors:
+                        status = "failed"
+                self.polls += 1
+
+                if status != entry["status"] and status not in ("ready", "failed"):
+                    print(f"   {entry['label']} status: {status}...")
+                entry["status"] = status
+
+                if status in ("ready", "failed"):
+                    with self.lock:
+                        del self.pending[snapshot_id]
+                    ready = status == "ready"
+                    if ready:
+                        print(f"   ✓ {entry['label']} scraping complete!")
+                    else:
+                        print(f"   ✗ {entry['label']} scraping failed")
+                    callback = entry["on_ready"] if ready else entry["on_failed"]
+                    try:
+                        if callback:
+                            callback(snapshot_id)
+                    finally:
+                        entry["future"].set_result(ready)
+                    continue
+
+                if retry_after:
+                    self.paused_until = time.monotonic() + retry_after
+                    entry["next_poll"] = self.paused_until
+                    break
+
+                entry["next_poll"] = time.monotonic() + self.next_delay(entry["delay"])
+                entry["delay"] = min(self.max_delay, entry["delay"] * self.factor)
+
+        with self.lock:
+            if not self.pending:
+                return None
+            soonest = min(entry["next_poll"] for entry in self.pending.values())
+        return max(0.0, max(soonest, self.paused_until) - time.monotonic())
+
+    def run(self):
+        """Poll until every tracked snapshot has finished"""
+        try:
+            while True:
+                wait = self.poll_once()
+                if wait is None:
+                    return
+                self.wakeup.clear()
+                self.wakeup.wait(wait)
+        except BaseException as e:
+            # Never leave a caller blocked on a future nobody will resolve
+            with self.lock:
+                entries = list(self.pending.values())
+                self.pending.clear()
+            for entry in entries:
+                if not entry["future"].done():
+                    entry["future"].set_exception(e)
+            raise
+
+    def start(self):
+        """Poll in a background thread until every tracked snapshot finishes"""
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
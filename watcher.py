@@ -0,0 +1,149 @@
+import time
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def next_interval(
+    interval,
+    new_comments,
+    elapsed,
+    min_interval,
+    max_interval,
+    target_new=50,
+    backoff=2.0,
+):
+    """
+    Seconds until a post's next refresh, from how fast comments arrive
+
+    A post that gained comments is refreshed again when about target_new
+    more are expected at its current rate. A post that gained none backs
+    off geometrically, so dead posts end up at max_interval.
+
+    Args:
+        interval: Interval used for the refresh that just finished
+        new_comments: Comments the refresh found that were not seen before
+        elapsed: Seconds since the previous refresh
+        min_interval: Shortest allowed interval
+        max_interval: Longest allowed interval
+        target_new: New comments to aim for per refresh
+        backoff: Multiplier applied when nothing new arrived
+    """
+    if new_comments > 0 and elapsed > 0:
+        wanted = target_new * elapsed / new_comments
+        # Move at most 4x per step so one burst or lull does not whipsaw it
+        wanted = min(max(wanted, interval / 4), interval * 4)
+    else:
+        wanted = interval * backoff
+    return min(max(wanted, min_interval), max_interval)
+
+
+class PostWatcher:
+    """
+    Keep refreshing a set of posts from one long-lived process
+
+    Each post has its own due time in a heap. Due posts are refreshed on a
+    small thread pool, so a slow scrape does not hold up the others, and
+    each refresh sets the post's next due time from next_interval().
+
+    Args:
+        refresh: Callable taking a post URL and returning the number of new
+            comments found, or None if the refresh failed
+        min_interval: Shortest seconds between refreshes of one post
+        max_interval: Longest seconds between refreshes of one post
+        target_new: New comments to aim for per refresh
+        max_parallel: Posts refreshed at the same time
+    """
+
+    def __init__(
+        self,
+        refresh,
+        min_interval=300,
+        max_interval=6 * 3600,
+        target_new=50,
+        max_parallel=4,
+    ):
+        self.refresh = refresh
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_new = target_new
+        self.max_parallel = max(1, max_parallel)
+        self.posts = {}
+        self.due = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+
+    def add(self, post_url, interval=None):
+        """Watch post_url, refreshing it right away"""
+        now = time.monotonic()
+        with self.lock:
+            self.posts[post_url] = {
+                "interval": interval or self.min_interval,
+                "last_refresh": None,
+                "running": False,
+            }
+            heapq.heappush(self.due, (now, post_url))
+        self.wakeup.set()
+
+    def run_one(self, post_url):
+        started = time.monotonic()
+        try:
+            new_comments = self.refresh(post_url)
+        except Exception as e:
+            print(f"   Refresh of {post_url} failed: {e}")
+            new_comments = None
+
+        with self.lock:
+            state = self.posts[post_url]
+            state["running"] = False
+            if new_comments is None:
+                # Failed refresh: retry on the current interval, no adaptation
+                interval = state["interval"]
+            else:
+                elapsed = (
+                    started - state["last_refresh"]
+                    if state["last_refresh"] is not None
+                    else state["interval"]
+                )
+                interval = next_interval(
+                    state["interval"],
+                    new_comments,
+                    elapsed,
+                    self.min_interval,
+                    self.max_interval,
+                    self.target_new,
+                )
+                state["last_refresh"] = started
+            state["interval"] = interval
+            heapq.heappush(self.due, (time.monotonic() + interval, post_url))
+        print(f"   Next refresh of {post_url} in {interval / 60:.1f} min")
+        self.wakeup.set()
+
+    def run(self):
+        """Refresh due posts until stop() is called or Ctrl-C"""
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            while not self.stopped.is_set():
+                with self.lock:
+                    now = time.monotonic()
+                    running = sum(state["running"] for state in self.posts.values())
+                    while (
+                        self.due
+                        and self.due[0][0] <= now
+                        and running < self.max_parallel
+                    ):
+                        _, post_url = heapq.heappop(self.due)
+                        self.posts[post_url]["running"] = True
+                        running += 1
+                        pool.submit(self.run_one, post_url)
+                    # At capacity, the next finishing refresh wakes us up
+                    wait = None
+                    if self.due and running < self.max_parallel:
+                        wait = max(0.0, self.due[0][0] - now)
+
+                self.wakeup.wait(timeout=wait)
+                self.wakeup.clear()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
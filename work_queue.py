@@ -0,0 +1,600 @@
+"""
+Distributed sentiment analysis of one large post across several machines
+
+The coordinator scrapes the post and its comments once, and splits the
+comments that need analysis into chunks in a shared SQLite file. Workers on
+any number of nodes, each with its own OpenRouter key and rate limits, lease
+chunks, analyze them and write the results back. A chunk whose lease expires
+(its worker died or hung) goes back to the queue. Once every chunk is done
+the coordinator assembles the usual output file.
+
+Usage:
+    python work_queue.py coordinate URL -n 50000 --queue /shared/queue.db
+    python work_queue.py work --queue /shared/queue.db -c 16 -b 20
+    python work_queue.py status --queue /shared/queue.db
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+import facebook_cli
+from dedup import DedupIndex
+from local_classifier import DEFAULT_MODEL_PATH
+from output_formats import format_of, output_extension
+
+
+DEFAULT_QUEUE_PATH = os.path.join(".cache", "work_queue.sqlite3")
+
+
+class WorkQueue:
+    """
+    Runs and leased chunks in a SQLite file shared by every node
+
+    Every claim, renewal and completion is one short write transaction, so
+    any number of processes can use the same file. Lease times are wall
+    clock seconds, so node clocks should be roughly in sync.
+
+    Args:
+        path: SQLite file; on several machines it must live on a filesystem
+            with working file locks
+        timeout: Seconds to wait for another process's write lock
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, timeout=30.0):
+        self.path = path
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Autocommit, with explicit BEGIN IMMEDIATE around read-modify-writes;
+        # shared with the lease renewal thread, guarded by self.lock
+        self.conn = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self.conn.executescript(
+            """CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                post_url TEXT NOT NULL,
+                post TEXT,
+                comments TEXT NOT NULL,
+                representatives TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id INTEGER PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                items TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                results TEXT
+            );
+            CREATE INDEX IF NOT EXISTS chunks_claim ON chunks (status, lease_expires);
+            CREATE INDEX IF NOT EXISTS chunks_run ON chunks (run_id, status);"""
+        )
+
+    def create_run(
+        self, post_url, post_data, comments_data, items, representatives, chunk_size=500
+    ):
+        """
+        Store a run and queue its comments for analysis
+
+        Args:
+            items: (comment index, comment text) pairs to analyze
+            representatives: Comment index -> index of the analyzed comment
+                whose labels it takes (see plan_items())
+            chunk_size: Comments per leased chunk
+
+        Returns:
+            str: The new run ID
+        """
+        run_id = uuid.uuid4().hex[:12]
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "INSERT INTO runs VALUES (?, ?, ?, ?, ?, 'open', ?)",
+                    (
+                        run_id,
+                        post_url,
+                        json.dumps(post_data, ensure_ascii=False),
+                        json.dumps(comments_data, ensure_ascii=False),
+                        json.dumps(list(representatives.items())),
+                        time.time(),
+                    ),
+                )
+                self.conn.executemany(
+                    "INSERT INTO chunks (run_id, items, status) VALUES (?, ?, 'pending')",
+                    [
+                        (run_id, json.dumps(items[start : start + chunk_size]))
+                        for start in range(0, len(items), chunk_size)
+                    ],
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return run_id
+
+    def load_run(self, run_id):
+        """
+        Returns:
+            dict: post_url, post, comments, representatives and status, or
+            None if unknown
+        """
+        with self.lock:
+            row = self.conn.execute(
+                """SELECT post_url, post, comments, representatives, status
+                FROM runs WHERE run_id = ?""",
+                (run_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "post_url": row[0],
+            "post": json.loads(row[1]),
+            "comments": json.loads(row[2]),
+            "representatives": dict(json.loads(row[3])),
+            "status": row[4],
+        }
+
+    def claim(self, worker, lease_seconds=300):
+        """
+        Lease the next pending chunk of an open run, or an expired lease
+
+        Returns:
+            dict: chunk_id, run_id, post_content, items and attempts, or None
+            when there is nothing to claim
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    """SELECT chunk_id, chunks.run_id, items, attempts FROM chunks
+                    JOIN runs ON runs.run_id = chunks.run_id
+                    WHERE runs.status = 'open' AND (
+                        chunks.status = 'pending'
+                        OR (chunks.status = 'leased' AND lease_expires < ?)
+                    )
+                    ORDER BY chunk_id LIMIT 1""",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                self.conn.execute(
+                    """UPDATE chunks SET status = 'leased', worker = ?,
+                    lease_expires = ?, attempts = attempts + 1
+                    WHERE chunk_id = ?""",
+                    (worker, now + lease_seconds, row[0]),
+                )
+                post = self.conn.execute(
+                    "SELECT post FROM runs WHERE run_id = ?", (row[1],)
+                ).fetchone()
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        return {
+            "chunk_id": row[0],
+            "run_id": row[1],
+            "post_content": (json.loads(post[0]) or {}).get("content", ""),
+            "items": json.loads(row[2]),
+            "attempts": row[3] + 1,
+        }
+
+    def renew(self, chunk_id, worker, lease_seconds=300):
+        """Extend a lease; returns False if the worker no longer holds it"""
+        with self.lock:
+            cursor = self.conn.execute(
+                """UPDATE chunks SET lease_expires = ?
+                WHERE chunk_id = ? AND worker = ? AND status = 'leased'""",
+                (time.time() + lease_seconds, chunk_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, chunk_id, worker, results):
+        """
+        Store a chunk's sentiment dicts, in the order of its items
+
+        Returns:
+            bool: False if the lease was lost and another worker took over
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                """UPDATE chunks SET status = 'done', results = ?, lease_expires = NULL
+                WHERE chunk_id = ? AND worker = ? AND status = 'leased'""",
+                (json.dumps(results, ensure_ascii=False), chunk_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def progress(self, run_id=None):
+        """
+        Returns:
+            dict: Chunk counts by state (pending, leased, expired, done) and
+            the highest attempt count, for one run or every open run
+        """
+        query = """SELECT
+                SUM(chunks.status = 'pending'),
+                SUM(chunks.status = 'leased' AND lease_expires >= ?),
+                SUM(chunks.status = 'leased' AND lease_expires < ?),
+                SUM(chunks.status = 'done'),
+                MAX(attempts)
+            FROM chunks JOIN runs ON runs.run_id = chunks.run_id"""
+        now = time.time()
+        with self.lock:
+            if run_id:
+                row = self.conn.execute(
+                    query + " WHERE chunks.run_id = ?", (now, now, run_id)
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    query + " WHERE runs.status = 'open'", (now, now)
+                ).fetchone()
+        return dict(
+            zip(
+                ("pending", "leased", "expired", "done", "attempts"),
+                (value or 0 for value in row),
+            )
+        )
+
+    def results(self, run_id):
+        """Yield (comment index, sentiment dict) for every finished item of a run"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT items, results FROM chunks WHERE run_id = ? AND status = 'done'",
+                (run_id,),
+            ).fetchall()
+        for items, results in rows:
+            for (idx, _), sentiment_data in zip(json.loads(items), json.loads(results)):
+                yield idx, sentiment_data
+
+    def close_run(self, run_id):
+        """Mark a run assembled; workers stop claiming its chunks"""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE runs SET status = 'assembled' WHERE run_id = ?", (run_id,)
+            )
+
+    def runs(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT run_id, post_url, status, created_at FROM runs ORDER BY created_at"
+            ).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def plan_items(comments_data):
+    """
+    Comments the workers have to analyze, with duplicate groups collapsed
+
+    Returns:
+        tuple: (list of (index, text) pairs to analyze, dict of every
+        comment index with text -> index of its group's representative)
+    """
+    index = DedupIndex(facebook_cli.dedup_threshold) if facebook_cli.dedup else None
+    items = []
+    representatives = {}
+    for idx, comment_data in enumerate(comments_data):
+        text = comment_data["comment_text"]
+        if not text:
+            continue
+        representative = index.assign(idx, text) if index else idx
+        representatives[idx] = representative
+        if representative == idx:
+            items.append((idx, text))
+
+    if index:
+        print(
+            f"   Deduplicated {index.total} comments into {index.groups} "
+            f"groups ({index.ratio():.1%} duplicates)"
+        )
+    return items, representatives
+
+
+def assemble(queue, run_id):
+    """
+    Apply a finished run's results to its comments
+
+    Returns:
+        tuple: (post_url, post_data, comments_data)
+    """
+    run = queue.load_run(run_id)
+    comments_data = run["comments"]
+    labels = dict(queue.results(run_id))
+
+    for idx, representative in run["representatives"].items():
+        sentiment_data = labels.get(representative)
+        if sentiment_data is None:
+            continue
+        comment_data = comments_data[idx]
+        comment_data["sentiment"] = sentiment_data.get("sentiment", "Neutral")
+        comment_data["emotion"] = sentiment_data.get("emotion", "Neutral")
+        comment_data["confidence"] = sentiment_data.get("confidence", 0.0)
+        comment_data["label_source"] = sentiment_data.get("label_source")
+        if idx != representative and comment_data["label_source"]:
+            comment_data["label_source"] = "dedup"
+
+    return run["post_url"], run["post"], comments_data
+
+
+def coordinate(args):
+    """Scrape, queue, wait for the workers and save the output"""
+    queue = WorkQueue(args.queue)
+
+    if args.run:
+        run = queue.load_run(args.run)
+        if run is None:
+            print(f"❌ Unknown run: {args.run}")
+            return
+        run_id = args.run
+        print(f"Rejoining run {run_id} ({run['post_url']})")
+    else:
+        post_url = facebook_cli.to_mobile_url(args.url)
+        post_data, comments_data = facebook_cli.scrape_facebook_post_and_comments(
+            post_url, args.num_comments, analyze=False
+        )
+        if not post_data or comments_data is None:
+            print("❌ Scraping failed")
+            return
+
+        items, representatives = plan_items(comments_data)
+        run_id = queue.create_run(
+            post_url, post_data, comments_data, items, representatives, args.chunk_size
+        )
+        facebook_cli.finish_run(post_url)
+        print(
+            f"\nQueued run {run_id}: {len(items)} comments in "
+            f"{-(-len(items) // args.chunk_size)} chunks of up to {args.chunk_size}"
+        )
+        print(f"   Start workers with: python work_queue.py work --queue {args.queue}")
+
+    reported = None
+    while True:
+        progress = queue.progress(run_id)
+        total = sum(
+            progress[state] for state in ("pending", "leased", "expired", "done")
+        )
+        if progress != reported:
+            print(
+                f"   Chunks: {progress['done']}/{total} done, {progress['leased']} "
+                f"leased, {progress['expired']} expired, {progress['pending']} pending"
+            )
+            reported = progress
+        if progress["done"] == total:
+            break
+        time.sleep(args.poll_interval)
+
+    post_url, post_data, comments_data = assemble(queue, run_id)
+    output_data = facebook_cli.build_output(post_url, post_data, comments_data)
+    facebook_cli.display_summary(post_data, comments_data)
+
+    output_file = args.output
+    fmt = args.format or (format_of(output_file) if output_file else "json")
+    if not output_file:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = f"facebook_data_{timestamp}{output_extension(fmt)}"
+    facebook_cli.save_results(output_data, output_file, fmt)
+    queue.close_run(run_id)
+    queue.close()
+
+
+def renew_lease(queue, chunk, worker, lease_seconds, done):
+    """Keep a chunk's lease alive until done is set"""
+    while not done.wait(lease_seconds / 3):
+        if not queue.renew(chunk["chunk_id"], worker, lease_seconds):
+            print(f"   ⚠ Lost the lease on chunk {chunk['chunk_id']}")
+            return
+
+
+def work(args):
+    """Claim and analyze chunks until stopped, or until idle with --exit-when-idle"""
+    queue = WorkQueue(args.queue)
+    worker = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Worker {worker} polling {args.queue}")
+    analyzed = 0
+
+    try:
+        while True:
+            chunk = queue.claim(worker, args.lease)
+            if chunk is None:
+                if args.exit_when_idle:
+                    break
+                time.sleep(args.poll_interval)
+                continue
+
+            print(
+                f"\n Chunk {chunk['chunk_id']} of run {chunk['run_id']}: "
+                f"{len(chunk['items'])} comments (attempt {chunk['attempts']})"
+            )
+            done = threading.Event()
+            renewer = threading.Thread(
+                target=renew_lease,
+                args=(queue, chunk, worker, args.lease, done),
+                daemon=True,
+            )
+            renewer.start()
+            try:
+                results = facebook_cli.analyze_comments(
+                    chunk["post_content"],
+                    [text for _, text in chunk["items"]],
+                    concurrency=args.concurrency,
+                    batch_size=args.batch_size,
+                )
+            finally:
+                done.set()
+                renewer.join()
+
+            if queue.complete(chunk["chunk_id"], worker, results):
+                analyzed += len(results)
+                print(f"   ✓ Chunk {chunk['chunk_id']} done")
+            else:
+                print(f"   ⚠ Chunk {chunk['chunk_id']} was reclaimed, results dropped")
+    except KeyboardInterrupt:
+        # The held lease expires and another worker picks the chunk up
+        print("\nWorker stopped")
+    finally:
+        queue.close()
+
+    print(f"Analyzed {analyzed} comments")
+
+
+def status(args):
+    """Print every run in the queue with its chunk progress"""
+    queue = WorkQueue(args.queue)
+    for run_id, post_url, run_status, created_at in queue.runs():
+        progress = queue.progress(run_id)
+        created = datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M:%S")
+        print(
+            f"{run_id}  {created}  {run_status:<9}  "
+            f"done {progress['done']}  leased {progress['leased']}  "
+            f"expired {progress['expired']}  pending {progress['pending']}  "
+            f"max attempts {progress['attempts']}  {post_url}"
+        )
+    queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Distributed sentiment analysis of one large Facebook post",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Usage:")[1],
+    )
+    parser.add_argument(
+        "--queue",
+        default=DEFAULT_QUEUE_PATH,
+        help=f"Shared SQLite queue file (default: {DEFAULT_QUEUE_PATH})",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between queue polls (default: 5)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coordinator = commands.add_parser(
+        "coordinate", help="Scrape a post, queue its comments and assemble the output"
+    )
+    coordinator.add_argument("url", nargs="?", help="Facebook post URL")
+    coordinator.add_argument(
+        "-n",
+        "--num-comments",
+        type=int,
+        default=100,
+        help="Maximum number of comments to scrape (default: 100)",
+    )
+    coordinator.add_argument(
+        "--chunk-size",
+        type=int,
+        default=500,
+        help="Comments per leased chunk (default: 500)",
+    )
+    coordinator.add_argument(
+        "--run", help="Wait for and assemble an existing run instead of scraping"
+    )
+    coordinator.add_argument(
+        "-o", "--output", help="Output file name (default: facebook_data_TIMESTAMP)"
+    )
+    coordinator.add_argument(
+        "-f",
+        "--format",
+        choices=["json", "jsonl", "parquet"],
+        help="Output format (default: from --output, else json)",
+    )
+    coordinator.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Queue duplicate comments too instead of copying labels",
+    )
+    coordinator.add_argument(
+        "--near-duplicates",
+        type=float,
+        nargs="?",
+        const=0.8,
+        default=None,
+        metavar="SIMILARITY",
+        help="Also share labels between near-duplicates (default when given: 0.8)",
+    )
+
+    worker = commands.add_parser("work", help="Claim and analyze queued chunks")
+    worker.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Comments analyzed in parallel (default: 8)",
+    )
+    worker.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Comments per LLM request (default: 1)",
+    )
+    worker.add_argument("--rpm", type=int, default=None, help="Requests per minute cap")
+    worker.add_argument("--tpm", type=int, default=None, help="Tokens per minute cap")
+    worker.add_argument(
+        "--no-cache", action="store_true", help="Ignore the on-disk sentiment cache"
+    )
+    worker.add_argument(
+        "--local-threshold",
+        type=float,
+        default=None,
+        help="Skip the LLM for comments the local model labels at this confidence",
+    )
+    worker.add_argument(
+        "--local-model", default=DEFAULT_MODEL_PATH, help="Local model file"
+    )
+    worker.add_argument(
+        "--lease",
+        type=float,
+        default=300.0,
+        help="Seconds a claimed chunk stays leased without renewal (default: 300)",
+    )
+    worker.add_argument("--worker-id", help="Name in the queue (default: hostname-pid)")
+    worker.add_argument(
+        "--exit-when-idle",
+        action="store_true",
+        help="Stop once there is nothing left to claim",
+    )
+
+    commands.add_parser("status", help="Show every run's chunk progress")
+
+    args = parser.parse_args()
+
+    if args.command == "coordinate":
+        if not args.url and not args.run:
+            parser.error("coordinate needs a post URL or --run")
+        facebook_cli.dedup = not args.no_dedup
+        facebook_cli.dedup_threshold = args.near_duplicates
+        coordinate(args)
+    elif args.command == "work":
+        # Each node's own OPENROUTER_API_KEY and limits; dedup is done by
+        # the coordinator
+        args.no_dedup = True
+        args.near_duplicates = None
+        args.no_sentiment = False
+        facebook_cli.configure(args)
+        work(args)
+    else:
+        status(args)
+
+
+if __name__ == "__main__":
+    main()